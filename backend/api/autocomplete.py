@@ -0,0 +1,58 @@
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+
+from recipes.models import Ingredient
+from .caching import get_version, invalidate_versions
+from .serializers import IngredientSerializer
+
+INGREDIENT_INDEX_VERSION_KEY = 'ingredient_index_version'
+PREFIX_UPPER_BOUND = chr(0x10FFFF)
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = []
+        self._payload = []
+
+    def invalidate(self):
+        invalidate_versions([INGREDIENT_INDEX_VERSION_KEY])
+
+    def _ensure_built(self):
+        version = get_version(INGREDIENT_INDEX_VERSION_KEY)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            entries = sorted(
+                (
+                    (item['name'].casefold(), item)
+                    for item in IngredientSerializer(
+                        Ingredient.objects.all(), many=True
+                    ).data
+                ),
+                key=itemgetter(0)
+            )
+            self._keys = [key for key, _ in entries]
+            self._payload = [item for _, item in entries]
+            self._version = version
+
+    def all(self):
+        self._ensure_built()
+        return list(self._payload)
+
+    def search(self, prefix, limit=None):
+        self._ensure_built()
+        keys, payload = self._keys, self._payload
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + PREFIX_UPPER_BOUND, start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return payload[start:end]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,127 @@
+import hashlib
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+RESPONSE_CACHE_KEY = 'response:{}'
+PERSONAL_VERSION_KEY = 'personal_version:{}'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, f'{time.time():.6f}:{uuid4().hex}', None)
+        version = cache.get(key)
+    return version
+
+
+def get_version_timestamp(version):
+    return int(float(version.split(':', 1)[0]))
+
+
+def invalidate_versions(keys):
+    cache.delete_many(list(keys))
+
+
+def get_personal_version_key(user_id):
+    return PERSONAL_VERSION_KEY.format(user_id)
+
+
+def invalidate_personal_versions(user_ids):
+    invalidate_versions(get_personal_version_key(pk) for pk in user_ids)
+
+
+def compute_etag(*parts):
+    return quote_etag(
+        hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+    )
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in (tag.strip() for tag in if_none_match.split(','))
+    if_modified_since = parse_http_date_safe(
+        request.headers.get('If-Modified-Since', '')
+    )
+    return (
+        last_modified is not None
+        and if_modified_since is not None
+        and last_modified <= if_modified_since
+    )
+
+
+class ConditionalGetMixin:
+    conditional_actions = ('list', 'retrieve')
+
+    def get_validators(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_conditional_response(self, view, request, *args, **kwargs):
+        validators = (
+            self.get_validators()
+            if self.action in self.conditional_actions else None
+        )
+        if validators is None:
+            return view(request, *args, **kwargs)
+        parts, last_modified = validators
+        etag = compute_etag(
+            request.build_absolute_uri(), request.user.pk, *parts
+        )
+        if is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.get_fresh_response(
+                etag, view, request, *args, **kwargs
+            )
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_fresh_response(self, etag, view, request, *args, **kwargs):
+        return view(request, *args, **kwargs)
+
+
+class VersionedConditionalGetMixin(ConditionalGetMixin):
+    def get_version_keys(self):
+        return []
+
+    def get_validators(self):
+        versions = [get_version(key) for key in self.get_version_keys()]
+        if not versions:
+            return None
+        return versions, max(map(get_version_timestamp, versions))
+
+
+class AnonymousResponseCacheMixin(VersionedConditionalGetMixin):
+    def get_fresh_response(self, etag, view, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        cache_key = RESPONSE_CACHE_KEY.format(etag.strip('"'))
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                cache_key, response.data, settings.RESPONSE_CACHE_TIMEOUT
+            )
+        return response
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кэш по умолчанию хранится в памяти процесса: версии кэша, ETag '
+        'и индексы не сбрасываются в других процессах после изменений.',
+        hint=(
+            'Задайте CACHE_BACKEND и CACHE_LOCATION для общего кэша '
+            '(например, FileBasedCache, как в docker-compose) '
+            'или запускайте один процесс.'
+        ),
+        id='api.W001',
+    )]
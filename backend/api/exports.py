@@ -0,0 +1,111 @@
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from recipes.models import ShoppingCartExport
+from .jobs import claim_next_job, finish_job
+from .renderers import SHOPPING_CART_RENDERERS
+from .shopping_cart import (
+    get_cached_shopping_cart,
+    get_shopping_cart_cache_key,
+    get_shopping_cart_ingredients,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_RENDERERS = {
+    renderer.format: renderer for renderer in SHOPPING_CART_RENDERERS
+}
+RESPOND_ASYNC = 'respond-async'
+EXPORT_SUPERSEDED = 'Список покупок изменился во время выгрузки'
+
+
+def prefers_async_export(request):
+    return any(
+        preference.strip().lower() == RESPOND_ASYNC
+        for preference in request.headers.get('Prefer', '').split(',')
+    )
+
+
+def requires_background_export(user, renderer):
+    return (
+        renderer.background
+        and get_cached_shopping_cart(user, renderer) is None
+        and user.shopping_cart_items.count()
+        > settings.SHOPPING_CART_SYNC_LIMIT
+    )
+
+
+def get_or_create_export(user, renderer):
+    cache_key = get_shopping_cart_cache_key(user.id, renderer)
+    export = (
+        user.shopping_cart_exports
+        .filter(cache_key=cache_key)
+        .exclude(status=ShoppingCartExport.Status.FAILED)
+        .first()
+    )
+    if export is None:
+        export = ShoppingCartExport.objects.create(
+            user=user, format=renderer.format, cache_key=cache_key
+        )
+    return export
+
+
+def claim_next_export():
+    return claim_next_job(ShoppingCartExport.objects.select_related('user'))
+
+
+def is_current_export(export, renderer):
+    return get_shopping_cart_cache_key(
+        export.user_id, renderer
+    ) == export.cache_key
+
+
+def render_export(export, renderer):
+    content = b''.join(
+        renderer.stream(get_shopping_cart_ingredients(export.user))
+    )
+    if not is_current_export(export, renderer):
+        return ShoppingCartExport.Status.FAILED, EXPORT_SUPERSEDED
+    export.file.save(
+        f'shopping_cart_{export.pk}.{export.format}',
+        ContentFile(content),
+        save=False
+    )
+    return ShoppingCartExport.Status.DONE, ''
+
+
+def delete_superseded_exports(export):
+    ShoppingCartExport.objects.filter(
+        user_id=export.user_id, format=export.format, pk__lt=export.pk
+    ).exclude(status=ShoppingCartExport.Status.PROCESSING).delete()
+
+
+def process_export(export):
+    renderer = EXPORT_RENDERERS[export.format]()
+    try:
+        export.status, export.error = render_export(export, renderer)
+    except Exception as error:
+        logger.exception('Не удалось сформировать выгрузку %s', export.pk)
+        export.status = ShoppingCartExport.Status.FAILED
+        export.error = str(error)
+    export.finished_at = timezone.now()
+    if not finish_job(export, 'status', 'error', 'file', 'finished_at'):
+        export.file.delete(save=False)
+        return export
+    if export.status == ShoppingCartExport.Status.DONE:
+        delete_superseded_exports(export)
+    return export
+
+
+def process_pending_exports(limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        export = claim_next_export()
+        if export is None:
+            break
+        process_export(export)
+        processed += 1
+    return processed
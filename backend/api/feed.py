@@ -0,0 +1,147 @@
+import heapq
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import models
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Subscription, User
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def get_fanout_subscriptions():
+    return Subscription.objects.filter(
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    )
+
+
+def fan_out_recipes(recipes):
+    recipes_by_author = {}
+    for recipe in recipes:
+        recipes_by_author.setdefault(recipe.author_id, []).append(recipe)
+    entries = [
+        TimelineEntry(
+            user_id=subscriber_id,
+            recipe_id=recipe.pk,
+            author_id=author_id,
+            publication_date=recipe.publication_date,
+        )
+        for subscriber_id, author_id in get_fanout_subscriptions().filter(
+            author__in=recipes_by_author
+        ).values_list('subscriber_id', 'author_id').iterator()
+        for recipe in recipes_by_author[author_id]
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+    return len(entries)
+
+
+def backfill_timelines(subscriber_ids, author_id):
+    recipes = list(
+        Recipe.objects.filter(author_id=author_id).values_list(
+            'pk', 'publication_date'
+        )
+    )
+    created = 0
+    for subscriber_id in subscriber_ids:
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=subscriber_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    publication_date=publication_date,
+                )
+                for recipe_id, publication_date in recipes
+            ],
+            batch_size=FANOUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        created += len(recipes)
+    return created
+
+
+def get_followers_count(author_id):
+    return User.objects.filter(pk=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+
+
+def follow_author(subscriber_id, author_id):
+    followers_count = get_followers_count(author_id)
+    if followers_count is None:
+        return 0
+    if followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS:
+        if followers_count == settings.FEED_FANOUT_MAX_FOLLOWERS + 1:
+            TimelineEntry.objects.filter(author_id=author_id).delete()
+        return 0
+    return backfill_timelines([subscriber_id], author_id)
+
+
+def remove_from_timeline(subscriber_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=subscriber_id, author_id=author_id
+    ).delete()
+
+
+def unfollow_author(subscriber_id, author_id):
+    remove_from_timeline(subscriber_id, author_id)
+    if get_followers_count(author_id) == settings.FEED_FANOUT_MAX_FOLLOWERS:
+        backfill_timelines(
+            Subscription.objects.filter(author_id=author_id).values_list(
+                'subscriber_id', flat=True
+            ),
+            author_id
+        )
+
+
+def rebuild_timelines():
+    TimelineEntry.objects.all().delete()
+    created = 0
+    subscriptions = get_fanout_subscriptions().order_by(
+        'author_id', 'pk'
+    ).values_list('author_id', 'subscriber_id').iterator()
+    for author_id, group in groupby(subscriptions, key=itemgetter(0)):
+        created += backfill_timelines(map(itemgetter(1), group), author_id)
+    return created
+
+
+def filter_before(queryset, cursor, date_field, pk_field):
+    if cursor is None:
+        return queryset
+    publication_date, pk = cursor
+    return queryset.filter(
+        models.Q(**{f'{date_field}__lt': publication_date})
+        | models.Q(**{date_field: publication_date, f'{pk_field}__lt': pk})
+    )
+
+
+def get_timeline_page(user, cursor, limit):
+    pushed = filter_before(
+        TimelineEntry.objects.filter(user=user),
+        cursor, 'publication_date', 'recipe_id'
+    ).order_by('-publication_date', '-recipe_id').values_list(
+        'publication_date', 'recipe_id'
+    )[:limit]
+    pulled = filter_before(
+        Recipe.objects.filter(author__in=models.Subquery(
+            user.subscriptions.filter(
+                author__followers_count__gt=(
+                    settings.FEED_FANOUT_MAX_FOLLOWERS
+                )
+            ).values('author_id')
+        )),
+        cursor, 'publication_date', 'id'
+    ).order_by('-publication_date', '-id').values_list(
+        'publication_date', 'id'
+    )[:limit]
+    page = []
+    for row in heapq.merge(list(pushed), list(pulled), reverse=True):
+        if not page or page[-1] != row:
+            page.append(row)
+        if len(page) == limit:
+            break
+    return page
@@ -1,6 +1,162 @@
+import json
+import re
+
 import django_filters
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import (
+    Case,
+    CharField,
+    FloatField,
+    IntegerField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from rest_framework.filters import OrderingFilter
 
 from recipes.models import Recipe
+from recipes.search_indexes import (
+    RECIPE_FTS_TABLE,
+    RECIPE_TABLE,
+    SEARCH_CONFIG,
+    SEARCH_VECTOR_COLUMN,
+)
+from .recipe_index import recipe_ingredient_index
+from .trending import TRENDING_ORDERING, order_by_trending
+
+WORD = re.compile(r'\w+')
+RUSSIAN_ENDING = re.compile(
+    r'(ями|ами|ого|его|ому|ему|ыми|ими|ой|ей|ий|ый|ая|яя|ое|ее|ые|ие'
+    r'|ам|ям|ах|ях|ов|ев|ом|ем|а|я|о|е|ы|и|у|ю|ь)$'
+)
+MIN_STEM_LENGTH = 3
+SNIPPET_START = '\ue000'
+SNIPPET_STOP = '\ue001'
+
+
+def search_by_name(queryset, query):
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.filter(name__icontains=query)
+    return (
+        queryset
+        .filter(Q(name__icontains=query) | Q(name__trigram_similar=query))
+        .annotate(similarity=TrigramSimilarity('name', query))
+        .order_by('-similarity', 'name')
+    )
+
+
+def to_fts_query(query):
+    terms = []
+    for word in WORD.findall(query.casefold()):
+        stem = RUSSIAN_ENDING.sub('', word)
+        terms.append(f'"{stem if len(stem) >= MIN_STEM_LENGTH else word}"*')
+    return ' '.join(terms)
+
+
+def get_full_text_expressions(vendor, query):
+    if vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        rank = f'ts_rank({RECIPE_TABLE}.{SEARCH_VECTOR_COLUMN}, {tsquery})'
+        return (
+            f'SELECT id FROM {RECIPE_TABLE} '
+            f'WHERE {SEARCH_VECTOR_COLUMN} @@ {tsquery}',
+            rank,
+            f"ts_headline('{SEARCH_CONFIG}', {RECIPE_TABLE}.text, "
+            f"{tsquery}, 'StartSel=\"{SNIPPET_START}\", "
+            f"StopSel=\"{SNIPPET_STOP}\", MaxFragments=1, MaxWords=20')",
+            [query],
+            [query],
+        )
+    match = (
+        f'FROM {RECIPE_FTS_TABLE} WHERE {RECIPE_FTS_TABLE} MATCH %s'
+    )
+    correlated = f'{match} AND rowid = {RECIPE_TABLE}.id'
+    return (
+        f'SELECT rowid {match}',
+        f'SELECT -bm25({RECIPE_FTS_TABLE}, 10.0, 1.0) {correlated}',
+        f"SELECT snippet({RECIPE_FTS_TABLE}, 1, '{SNIPPET_START}', "
+        f"'{SNIPPET_STOP}', '…', 16) {correlated}",
+        [query],
+        [query],
+    )
+
+
+def format_snippet(snippet):
+    if snippet is None:
+        return None
+    return escape(snippet).replace(SNIPPET_START, '<b>').replace(
+        SNIPPET_STOP, '</b>'
+    )
+
+
+def search_full_text(queryset, query):
+    vendor = connections[queryset.db].vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return search_by_name(queryset, query)
+    if vendor == 'sqlite':
+        query = to_fts_query(query)
+    if not query.strip():
+        return queryset.none()
+    matches, rank, snippet, match_params, params = (
+        get_full_text_expressions(vendor, query)
+    )
+    return queryset.filter(pk__in=RawSQL(matches, match_params)).annotate(
+        search_rank=RawSQL(rank, params, output_field=FloatField()),
+        search_snippet=RawSQL(snippet, params, output_field=CharField()),
+    ).order_by('-search_rank', '-id')
+
+
+def ids_subquery(queryset, ids):
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return RawSQL('SELECT value FROM json_each(%s)', [json.dumps(ids)])
+    if vendor == 'postgresql':
+        return RawSQL('SELECT unnest(%s::integer[])', [ids])
+    return ids
+
+
+def filter_by_ingredients(queryset, ingredient_ids, max_missing=None):
+    if max_missing is None:
+        return queryset.filter(pk__in=ids_subquery(
+            queryset, recipe_ingredient_index.match_all(ingredient_ids)
+        ))
+    ranks = recipe_ingredient_index.match_coverage(
+        ingredient_ids, max_missing
+    )
+    levels = {}
+    for recipe_id, level in ranks.items():
+        levels.setdefault(level, []).append(recipe_id)
+    return queryset.filter(
+        pk__in=ids_subquery(queryset, list(ranks))
+    ).annotate(
+        missing_ingredients=Case(
+            *(
+                When(
+                    pk__in=ids_subquery(queryset, recipe_ids),
+                    then=Value(level)
+                )
+                for level, recipe_ids in levels.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    ).order_by('missing_ingredients', '-publication_date', '-id')
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    def filter_queryset(self, request, queryset, view):
+        if request.query_params.get(
+            self.ordering_param, ''
+        ).strip() == TRENDING_ORDERING:
+            return order_by_trending(queryset)
+        return super().filter_queryset(request, queryset, view)
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -9,10 +165,19 @@ class RecipeFilter(django_filters.FilterSet):
         method='filter_in_shopping_cart'
     )
     author = django_filters.NumberFilter(field_name='author__id')
+    search = django_filters.CharFilter(method='filter_search')
+    q = django_filters.CharFilter(method='filter_full_text')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    missing = django_filters.NumberFilter(
+        method='filter_missing', min_value=0
+    )
 
     class Meta:
         model = Recipe
-        fields = ['author', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'author', 'is_favorited', 'is_in_shopping_cart', 'search', 'q',
+            'ingredients', 'missing',
+        ]
 
     def filter_favorited(self, queryset, name, value):
         user = self.request.user
@@ -27,3 +192,19 @@ class RecipeFilter(django_filters.FilterSet):
         if value and user.is_authenticated:
             return queryset.filter(user_shopping_cart__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_by_name(queryset, value)
+
+    def filter_full_text(self, queryset, name, value):
+        return search_full_text(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        max_missing = self.form.cleaned_data.get('missing')
+        return filter_by_ingredients(
+            queryset, [int(pk) for pk in value],
+            None if max_missing is None else int(max_missing)
+        )
+
+    def filter_missing(self, queryset, name, value):
+        return queryset
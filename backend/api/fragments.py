@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from rest_framework import serializers
+
+FRAGMENT_KEY = 'fragment:{}:{}:{}:{}:{}'
+
+
+class FragmentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        instances = list(iterable)
+        self.child.load_fragments(instances)
+        return [self.child.to_representation(item) for item in instances]
+
+
+class FragmentCacheMixin:
+    live_fields = ()
+    fragment_prefetch = ()
+
+    def get_fragment_key(self, instance):
+        request = self.context.get('request')
+        return FRAGMENT_KEY.format(
+            type(self).__name__,
+            request.scheme if request else '',
+            request.get_host() if request else '',
+            instance.pk,
+            instance.updated_at.timestamp(),
+        )
+
+    @property
+    def fragments(self):
+        if not hasattr(self, '_fragments'):
+            self._fragments = {}
+        return self._fragments
+
+    def load_fragments(self, instances):
+        keys = {
+            self.get_fragment_key(instance): instance
+            for instance in instances
+        }
+        self.fragments.update(cache.get_many(list(keys)))
+        missing = [
+            instance for key, instance in keys.items()
+            if key not in self.fragments
+        ]
+        if self.fragment_prefetch:
+            models.prefetch_related_objects(missing, *self.fragment_prefetch)
+        built = {
+            self.get_fragment_key(instance): self.build_fragment(instance)
+            for instance in missing
+        }
+        cache.set_many(built, settings.FRAGMENT_CACHE_TIMEOUT)
+        self.fragments.update(built)
+        for name in self.live_fields:
+            field = self.fields[name]
+            if isinstance(field, FragmentCacheMixin):
+                field.load_fragments([
+                    field.get_attribute(instance) for instance in instances
+                ])
+
+    def build_fragment(self, instance):
+        fragment = {}
+        for field in self._readable_fields:
+            if field.field_name in self.live_fields:
+                continue
+            attribute = field.get_attribute(instance)
+            fragment[field.field_name] = (
+                None if attribute is None
+                else field.to_representation(attribute)
+            )
+        return fragment
+
+    def get_fragment(self, instance):
+        key = self.get_fragment_key(instance)
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            fragment = cache.get(key)
+        if fragment is None:
+            models.prefetch_related_objects(
+                [instance], *self.fragment_prefetch
+            )
+            fragment = self.build_fragment(instance)
+            cache.set(key, fragment, settings.FRAGMENT_CACHE_TIMEOUT)
+            self.fragments[key] = fragment
+        return fragment
+
+    def to_representation(self, instance):
+        fragment = self.get_fragment(instance)
+        representation = {}
+        for field in self._readable_fields:
+            name = field.field_name
+            if name in self.live_fields:
+                representation[name] = field.to_representation(
+                    field.get_attribute(instance)
+                )
+            else:
+                representation[name] = fragment[name]
+        return representation
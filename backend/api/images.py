@@ -0,0 +1,189 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, models
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import ImageVariants, Recipe
+from .jobs import claim_next_job, finish_job
+from .recipe_cache import invalidate_recipe_responses
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+VARIANT_FIELDS = ('thumbnail', 'thumbnail_webp', 'webp')
+WEBP_MODES = ('RGB', 'RGBA')
+JPEG_MODES = ('RGB', 'L')
+
+
+def request_image_variants(source):
+    if not source:
+        return None
+    variants, _ = ImageVariants.objects.get_or_create(source=source)
+    return variants
+
+
+def link_image_variants(model, instance, field, variants_field):
+    variants = request_image_variants(getattr(instance, field).name)
+    variants_id = variants.pk if variants else None
+    if getattr(instance, f'{variants_field}_id') == variants_id:
+        return
+    model.objects.filter(pk=instance.pk).update(
+        **{variants_field: variants}
+    )
+    setattr(instance, variants_field, variants)
+
+
+def backfill_image_variants():
+    created = 0
+    for model, field, variants_field in (
+        (Recipe, 'image', 'image_variants'),
+        (User, 'avatar', 'avatar_variants'),
+    ):
+        missing = model.objects.filter(
+            **{f'{variants_field}__isnull': True}
+        ).exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        sources = set(missing.values_list(field, flat=True).distinct())
+        sources.difference_update(
+            ImageVariants.objects.filter(source__in=sources).values_list(
+                'source', flat=True
+            )
+        )
+        ImageVariants.objects.bulk_create(
+            [ImageVariants(source=source) for source in sources],
+            ignore_conflicts=True,
+        )
+        created += len(sources)
+        missing.update(**{variants_field: models.Subquery(
+            ImageVariants.objects.filter(
+                source=models.OuterRef(field)
+            ).values('pk')[:1]
+        )})
+    return created
+
+
+def encode_image(image, image_format, **options):
+    if image_format == 'WEBP' and image.mode not in WEBP_MODES:
+        image = image.convert(
+            'RGBA' if 'A' in image.getbands()
+            or 'transparency' in image.info else 'RGB'
+        )
+    elif image_format == 'JPEG' and image.mode not in JPEG_MODES:
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def render_image_variants(file):
+    with Image.open(file) as image:
+        image_format = image.format or 'PNG'
+        image = ImageOps.exif_transpose(image)
+        thumbnail = image.copy()
+        thumbnail.thumbnail(settings.IMAGE_THUMBNAIL_SIZE, Image.LANCZOS)
+        quality = settings.IMAGE_WEBP_QUALITY
+        return {
+            'thumbnail': (
+                image_format.lower(), encode_image(thumbnail, image_format)
+            ),
+            'thumbnail_webp': (
+                'webp', encode_image(thumbnail, 'WEBP', quality=quality)
+            ),
+            'webp': ('webp', encode_image(image, 'WEBP', quality=quality)),
+        }
+
+
+def claim_next_image_variants():
+    return claim_next_job(ImageVariants.objects.all())
+
+
+def refresh_image_owners(variants):
+    now = timezone.now()
+    recipe_ids = set(variants.recipes.values_list('pk', flat=True))
+    user_ids = list(variants.users.values_list('pk', flat=True))
+    recipe_ids.update(
+        Recipe.objects.filter(author__in=user_ids).values_list(
+            'pk', flat=True
+        )
+    )
+    variants.recipes.update(updated_at=now)
+    variants.users.update(updated_at=now)
+    if recipe_ids:
+        invalidate_recipe_responses(recipe_ids)
+
+
+def process_image_variants(variants):
+    stem = os.path.splitext(os.path.basename(variants.source))[0]
+    try:
+        with default_storage.open(variants.source) as file:
+            rendered = render_image_variants(file)
+        for field, (extension, content) in rendered.items():
+            suffix = '' if field == 'webp' else '_thumb'
+            getattr(variants, field).save(
+                f'{stem}{suffix}.{extension}', ContentFile(content),
+                save=False
+            )
+    except Exception as error:
+        logger.exception(
+            'Не удалось обработать изображение %s', variants.source
+        )
+        variants.status = ImageVariants.Status.FAILED
+        variants.error = str(error)
+    else:
+        variants.status = ImageVariants.Status.DONE
+    variants.finished_at = timezone.now()
+    if not finish_job(
+        variants, 'status', 'error', *VARIANT_FIELDS, 'finished_at'
+    ):
+        for field in VARIANT_FIELDS:
+            getattr(variants, field).delete(save=False)
+        return variants
+    if variants.status == ImageVariants.Status.DONE:
+        refresh_image_owners(variants)
+    return variants
+
+
+def process_image_queue(limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        variants = claim_next_image_variants()
+        if variants is None:
+            break
+        process_image_variants(variants)
+        processed += 1
+    return processed
+
+
+def run_image_worker(limit):
+    try:
+        return process_image_queue(limit)
+    finally:
+        connection.close()
+
+
+def process_pending_images(limit=None, workers=1):
+    if workers <= 1:
+        return process_image_queue(limit)
+    share = None if limit is None else -(-limit // workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(run_image_worker, [share] * workers))
+
+
+def get_file_url(file, request):
+    if not file:
+        return None
+    return request.build_absolute_uri(file.url) if request else file.url
+
+
+def get_image_variant_url(variants, field, request):
+    if variants is None or variants.status != ImageVariants.Status.DONE:
+        return None
+    return get_file_url(getattr(variants, field), request)
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+CLAIM_BATCH_SIZE = 10
+
+
+def get_claimable_jobs(queryset, now):
+    model = queryset.model
+    expired = now - timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+    return queryset.filter(
+        models.Q(status=model.Status.PENDING)
+        | models.Q(status=model.Status.PROCESSING, started_at__lt=expired)
+        | models.Q(status=model.Status.PROCESSING, started_at__isnull=True)
+    )
+
+
+def claim_next_job(queryset):
+    now = timezone.now()
+    claimable = get_claimable_jobs(queryset, now)
+    candidates = (
+        claimable.order_by('created_at').values_list('pk', flat=True)
+    )[:CLAIM_BATCH_SIZE]
+    for pk in candidates:
+        claimed = claimable.filter(pk=pk).update(
+            status=queryset.model.Status.PROCESSING, started_at=now
+        )
+        if claimed:
+            return queryset.get(pk=pk)
+    return None
+
+
+def finish_job(job, *fields):
+    model = type(job)
+    return bool(model.objects.filter(
+        pk=job.pk,
+        status=model.Status.PROCESSING,
+        started_at=job.started_at,
+    ).update(**{field: getattr(job, field) for field in fields}))
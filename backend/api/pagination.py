@@ -1,8 +1,172 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = settings.MAX_PAGE_SIZE
     page_size_query_param = 'limit'
     max_page_size = settings.MAX_PAGE_SIZE
+
+
+class KeysetPagination(BasePagination):
+    page_size = settings.MAX_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    mode = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+    nulls_last = frozenset()
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            request.query_params.get(cls.mode_query_param) == cls.mode
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            queryset = queryset.filter(self.get_cursor_filter(cursor))
+        queryset = queryset.order_by(*(
+            self.get_order_expression(field, descending)
+            for field, descending in self.ordering
+        ))
+        results = list(queryset[:self.page_size + 1])
+        self.next_cursor = None
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            self.next_cursor = [
+                getattr(results[-1], field) for field, _ in self.ordering
+            ]
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = []
+        nulls_last = set()
+        for field in (
+            queryset.query.order_by or queryset.model._meta.ordering
+        ):
+            if isinstance(field, OrderBy):
+                name = field.expression.name
+                if field.nulls_last:
+                    nulls_last.add(name)
+                field = f'-{name}' if field.descending else name
+            descending = field.startswith('-')
+            field = field.lstrip('-')
+            if field == 'pk':
+                field = queryset.model._meta.pk.name
+            ordering.append((field, descending))
+        pk_name = queryset.model._meta.pk.name
+        if pk_name not in (field for field, _ in ordering):
+            descending = ordering[-1][1] if ordering else False
+            ordering.append((pk_name, descending))
+        self.nulls_last = frozenset(nulls_last)
+        return ordering
+
+    def get_order_expression(self, field, descending):
+        if field not in self.nulls_last:
+            return f'-{field}' if descending else field
+        if descending:
+            return F(field).desc(nulls_last=True)
+        return F(field).asc(nulls_last=True)
+
+    def get_cursor_filter(self, cursor):
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(self.ordering, cursor):
+            lookup = 'lt' if descending else 'gt'
+            if value is not None:
+                condition |= Q(**equal, **{f'{field}__{lookup}': value})
+                if field in self.nulls_last:
+                    condition |= Q(**equal, **{f'{field}__isnull': True})
+            equal[field] = value
+        return condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.to_python(model, field, value)
+                for (field, _), value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, model, field, value):
+        try:
+            return model._meta.get_field(field).to_python(value)
+        except FieldDoesNotExist:
+            return value
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(json.dumps([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in values
+        ]).encode()).decode()
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.mode_query_param, self.mode)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.next_cursor)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+
+class TimelinePagination(KeysetPagination):
+    ordering = [('publication_date', True), ('id', True)]
+
+    def paginate_timeline(self, get_page, model, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, model)
+        rows = get_page(cursor, self.page_size + 1)
+        self.next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_cursor = list(rows[-1])
+        return [pk for _, pk in rows]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.next_cursor)
+        )
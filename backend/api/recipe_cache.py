@@ -0,0 +1,34 @@
+from .caching import invalidate_versions
+
+RECIPE_LIST_VERSION_KEY = 'recipe_list_version'
+RECIPE_VERSION_KEY = 'recipe_version:{}'
+FAVORITES_ORDERING_VERSION_KEY = 'recipe_favorites_ordering_version'
+TRENDING_ORDERING_VERSION_KEY = 'recipe_trending_ordering_version'
+
+
+def get_recipe_list_version_keys(ordering):
+    keys = [RECIPE_LIST_VERSION_KEY]
+    if 'favorites_count' in ordering:
+        keys.append(FAVORITES_ORDERING_VERSION_KEY)
+    if 'trending' in ordering:
+        keys.append(TRENDING_ORDERING_VERSION_KEY)
+    return keys
+
+
+def get_recipe_version_keys(recipe_id):
+    return [RECIPE_VERSION_KEY.format(recipe_id)]
+
+
+def invalidate_recipe_responses(recipe_ids):
+    invalidate_versions(
+        [RECIPE_LIST_VERSION_KEY]
+        + [RECIPE_VERSION_KEY.format(pk) for pk in recipe_ids]
+    )
+
+
+def invalidate_favorites_ordering():
+    invalidate_versions([FAVORITES_ORDERING_VERSION_KEY])
+
+
+def invalidate_trending_ordering():
+    invalidate_versions([TRENDING_ORDERING_VERSION_KEY])
@@ -0,0 +1,200 @@
+import threading
+from functools import reduce
+from itertools import groupby, islice
+from operator import and_, itemgetter, or_
+
+from recipes.models import Recipe
+from .caching import get_version, invalidate_versions
+
+RECIPE_INGREDIENT_INDEX_VERSION_KEY = 'recipe_ingredient_index_version'
+RECIPE_INGREDIENT_CHANGES_KEY = 'recipe_ingredient_index_changes'
+
+
+def build_bitset(ids):
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_bits_desc(bitset):
+    bits = bin(bitset)[2:]
+    top = len(bits) - 1
+    position = bits.find('1')
+    while position != -1:
+        yield top - position
+        position = bits.find('1', position + 1)
+
+
+def add_to_counter(planes, bitset):
+    carry = bitset
+    for index, plane in enumerate(planes):
+        planes[index] = plane ^ carry
+        carry &= plane
+        if not carry:
+            return
+    planes.append(carry)
+
+
+def count_equals(planes, candidates, count):
+    if count >> len(planes):
+        return 0
+    mask = candidates
+    for index, plane in enumerate(planes):
+        mask &= plane if count >> index & 1 else ~plane
+    return mask
+
+
+class RecipeIngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._changes = None
+        self._watermark = None
+        self._recipes = {}
+        self._ordinals = {}
+        self._snapshot = ({}, {}, [])
+
+    def invalidate(self):
+        invalidate_versions([RECIPE_INGREDIENT_INDEX_VERSION_KEY])
+
+    def mark_changed(self):
+        invalidate_versions([RECIPE_INGREDIENT_CHANGES_KEY])
+
+    def _ensure_fresh(self):
+        version = get_version(RECIPE_INGREDIENT_INDEX_VERSION_KEY)
+        changes = get_version(RECIPE_INGREDIENT_CHANGES_KEY)
+        if (version, changes) == (self._version, self._changes):
+            return self._snapshot
+        with self._lock:
+            if (version, changes) == (self._version, self._changes):
+                return self._snapshot
+            if version != self._version:
+                self._rebuild()
+            else:
+                self._refresh()
+            self._version = version
+            self._changes = changes
+            return self._snapshot
+
+    def _load(self, queryset):
+        recipes = {}
+        watermark = None
+        rows = queryset.order_by('pk').values_list(
+            'pk', 'updated_at', 'recipe_ingredients__ingredient_id'
+        ).iterator()
+        for (recipe_id, updated_at), group in groupby(
+            rows, key=itemgetter(0, 1)
+        ):
+            recipes[recipe_id] = frozenset(
+                ingredient_id for _, _, ingredient_id in group
+                if ingredient_id is not None
+            )
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+        return recipes, watermark
+
+    def _rebuild(self):
+        recipes, watermark = self._load(Recipe.objects.all())
+        recipe_ids = [
+            recipe_id for recipe_id, ingredients in recipes.items()
+            if ingredients
+        ]
+        postings = {}
+        sizes = {}
+        for ordinal, recipe_id in enumerate(recipe_ids):
+            ingredients = recipes[recipe_id]
+            for ingredient_id in ingredients:
+                postings.setdefault(ingredient_id, []).append(ordinal)
+            sizes.setdefault(len(ingredients), []).append(ordinal)
+        self._recipes = {
+            recipe_id: recipes[recipe_id] for recipe_id in recipe_ids
+        }
+        self._ordinals = {
+            recipe_id: ordinal for ordinal, recipe_id in enumerate(recipe_ids)
+        }
+        self._watermark = watermark
+        self._snapshot = (
+            {
+                ingredient_id: build_bitset(ordinals)
+                for ingredient_id, ordinals in postings.items()
+            },
+            {size: build_bitset(ordinals) for size, ordinals in sizes.items()},
+            recipe_ids,
+        )
+
+    def _refresh(self):
+        queryset = Recipe.objects.all()
+        if self._watermark is not None:
+            queryset = queryset.filter(updated_at__gte=self._watermark)
+        loaded, watermark = self._load(queryset)
+        if watermark is None:
+            return
+        postings, sizes = map(dict, self._snapshot[:2])
+        recipe_ids = self._snapshot[2]
+        appended = []
+        for recipe_id, new in loaded.items():
+            old = self._recipes.get(recipe_id, frozenset())
+            if old == new:
+                continue
+            if recipe_id not in self._ordinals:
+                self._ordinals[recipe_id] = len(recipe_ids) + len(appended)
+                appended.append(recipe_id)
+            bit = 1 << self._ordinals[recipe_id]
+            for ingredient_id in old - new:
+                postings[ingredient_id] &= ~bit
+            for ingredient_id in new - old:
+                postings[ingredient_id] = postings.get(ingredient_id, 0) | bit
+            if old:
+                sizes[len(old)] &= ~bit
+            if new:
+                sizes[len(new)] = sizes.get(len(new), 0) | bit
+                self._recipes[recipe_id] = new
+            else:
+                self._recipes.pop(recipe_id, None)
+        self._watermark = watermark
+        self._snapshot = (postings, sizes, recipe_ids + appended)
+
+    def match_all(self, ingredient_ids, limit=None):
+        postings, _, recipe_ids = self._ensure_fresh()
+        bitsets = [postings.get(pk, 0) for pk in set(ingredient_ids)]
+        if not bitsets:
+            return []
+        return [
+            recipe_ids[ordinal] for ordinal in islice(
+                iter_bits_desc(reduce(and_, bitsets)), limit
+            )
+        ]
+
+    def match_coverage(self, ingredient_ids, max_missing, limit=None):
+        postings, sizes, recipe_ids = self._ensure_fresh()
+        bitsets = [postings.get(pk, 0) for pk in set(ingredient_ids)]
+        planes = []
+        for bitset in bitsets:
+            add_to_counter(planes, bitset)
+        candidates = reduce(or_, bitsets, 0)
+        matched = {}
+        missing = {}
+        for size, recipes in sizes.items():
+            for count in range(
+                max(size - max_missing, 1), min(size, len(bitsets)) + 1
+            ):
+                if count not in matched:
+                    matched[count] = count_equals(planes, candidates, count)
+                missing[size - count] = (
+                    missing.get(size - count, 0)
+                    | recipes & matched[count]
+                )
+        ranks = {}
+        for level in sorted(missing):
+            for ordinal in iter_bits_desc(missing[level]):
+                if limit is not None and len(ranks) >= limit:
+                    return ranks
+                ranks[recipe_ids[ordinal]] = level
+        return ranks
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+import os
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+FONT_NAME = "DejaVuSans"
+FONT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    'static',
+    'fonts',
+    'DejaVuSans.ttf'
+)
+TITLE_FONT = FONT_NAME
+TITLE_FONT_SIZE = 16
+TEXT_FONT = FONT_NAME
+TEXT_FONT_SIZE = 12
+MARGIN_TOP = 50
+MARGIN_LEFT = 50
+LINE_HEIGHT = 20
+TITLE_LINE_HEIGHT = 30
+MARGIN_BOTTOM = 50
+
+SHOPPING_LIST_TITLE = "Список покупок"
+EMPTY_SHOPPING_LIST = "Корзина пуста."
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+
+
+def register_fonts():
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def format_shopping_list_line(idx, item):
+    return (
+        f"{idx}. {item['ingredient__name']} "
+        f"- {item['total_amount']} "
+        f"{item['ingredient__measurement_unit']}"
+    )
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    charset = 'utf-8'
+    cacheable = False
+    background = False
+
+    def stream(self, ingredients):
+        yield f'{SHOPPING_LIST_TITLE}\n\n'.encode(self.charset)
+        idx = 0
+        for idx, item in enumerate(ingredients, 1):
+            line = format_shopping_list_line(idx, item)
+            yield f'{line}\n'.encode(self.charset)
+        if not idx:
+            yield f'{EMPTY_SHOPPING_LIST}\n'.encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None and response.exception:
+            response['Content-Type'] = JSONRenderer.media_type
+            return JSONRenderer().render(data)
+        return b''.join(self.stream(data))
+
+
+class ShoppingCartPDFRenderer(ShoppingCartRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    cacheable = True
+    background = True
+
+    def stream(self, ingredients):
+        buffer = io.BytesIO()
+        p = canvas.Canvas(buffer, pagesize=A4, invariant=True)
+        _, height = A4
+        y = height - MARGIN_TOP
+        p.setFont(TITLE_FONT, TITLE_FONT_SIZE)
+        p.drawString(MARGIN_LEFT, y, SHOPPING_LIST_TITLE)
+        y -= TITLE_LINE_HEIGHT
+        p.setFont(TEXT_FONT, TEXT_FONT_SIZE)
+        idx = 0
+        for idx, item in enumerate(ingredients, 1):
+            p.drawString(MARGIN_LEFT, y, format_shopping_list_line(idx, item))
+            y -= LINE_HEIGHT
+            if y < MARGIN_BOTTOM:
+                p.showPage()
+                y = height - MARGIN_TOP
+                p.setFont(TEXT_FONT, TEXT_FONT_SIZE)
+        if not idx:
+            p.drawString(MARGIN_LEFT, y, EMPTY_SHOPPING_LIST)
+        p.showPage()
+        p.save()
+        yield buffer.getvalue()
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in self._rows(ingredients):
+            writer.writerow(row)
+            yield buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+
+    def _rows(self, ingredients):
+        yield CSV_HEADER
+        for item in ingredients:
+            yield (
+                item['ingredient__name'],
+                item['total_amount'],
+                item['ingredient__measurement_unit'],
+            )
+
+
+class ShoppingCartJSONRenderer(ShoppingCartRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        yield b'['
+        for idx, item in enumerate(ingredients):
+            chunk = json.dumps({
+                'name': item['ingredient__name'],
+                'amount': item['total_amount'],
+                'measurement_unit': item['ingredient__measurement_unit'],
+            }, ensure_ascii=False).encode(self.charset)
+            yield b',' + chunk if idx else chunk
+        yield b']'
+
+
+SHOPPING_CART_RENDERERS = (
+    ShoppingCartPDFRenderer,
+    ShoppingCartTextRenderer,
+    ShoppingCartCSVRenderer,
+    ShoppingCartJSONRenderer,
+)
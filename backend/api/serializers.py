@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.urls import reverse
 from djoser.serializers import (
     UserCreateSerializer as BaseUserCreateSerializer,
     UserSerializer as BaseUserSerializer,
@@ -6,8 +8,13 @@ from djoser.serializers import (
 from rest_framework import serializers
 
 from recipes.models import (
-    Ingredient, Recipe, RecipeIngredient)
+    Ingredient, Recipe, RecipeIngredient, ShoppingCartExport)
 from users.models import Subscription
+from .filters import format_snippet
+from .fragments import FragmentCacheMixin, FragmentListSerializer
+from .images import get_file_url, get_image_variant_url
+from .shopping_cart import update_recipe_in_shopping_cart_totals
+from .similarity import request_similarity_refresh
 
 from drf_extra_fields.fields import Base64ImageField
 
@@ -20,6 +27,30 @@ MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 32000
 
 
+def get_subscribed_author_ids(context):
+    request = context.get('request')
+    if not request or not request.user.is_authenticated:
+        return frozenset()
+    author_ids = getattr(request, '_subscribed_author_ids', None)
+    if author_ids is None:
+        author_ids = frozenset(
+            request.user.subscriptions.values_list('author_id', flat=True)
+        )
+        request._subscribed_author_ids = author_ids
+    return author_ids
+
+
+def get_recipes_limit(request):
+    limit = request.query_params.get('recipes_limit') if request else None
+    if not limit:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        return None
+    return limit if limit >= 0 else None
+
+
 class UserPostSerializer(BaseUserCreateSerializer):
     class Meta(BaseUserCreateSerializer.Meta):
         model = User
@@ -50,15 +81,14 @@ class FoodgramUserSerializer(BaseUserSerializer):
         read_only_fields = fields
 
     def get_is_subscribed(self, author):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return request.user.subscriptions.filter(author=author).exists()
+        return author.id in get_subscribed_author_ids(self.context)
 
 
-class UserGetSerializer(serializers.ModelSerializer):
+class UserGetSerializer(FragmentCacheMixin, serializers.ModelSerializer):
     avatar = Base64ImageField(allow_null=True, required=False)
+    avatar_thumbnail = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
+    live_fields = ('is_subscribed',)
 
     class Meta:
         model = User
@@ -69,14 +99,19 @@ class UserGetSerializer(serializers.ModelSerializer):
             'first_name',
             'last_name',
             'avatar',
+            'avatar_thumbnail',
             'is_subscribed',
         )
+        list_serializer_class = FragmentListSerializer
 
-    def get_is_subscribed(self, author):
+    def get_avatar_thumbnail(self, author):
         request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return request.user.subscriptions.filter(author=author).exists()
+        return get_image_variant_url(
+            author.avatar_variants, 'thumbnail', request
+        ) or get_file_url(author.avatar, request)
+
+    def get_is_subscribed(self, author):
+        return author.id in get_subscribed_author_ids(self.context)
 
 
 class AvatarUpdateSerializer(serializers.Serializer):
@@ -109,47 +144,104 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         ]
 
 
+class RecipeIngredientWriteListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        ingredients = Ingredient.objects.in_bulk(
+            [item['id'] for item in attrs]
+        )
+        missing = sorted(
+            {item['id'] for item in attrs} - ingredients.keys()
+        )
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                + ', '.join(str(pk) for pk in missing)
+            )
+        for item in attrs:
+            item['id'] = ingredients[item['id']]
+        return attrs
+
+
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(min_value=MIN_INGREDIENT_AMOUNT,
                                       max_value=MAX_INGREDIENT_AMOUNT)
 
     class Meta:
         model = RecipeIngredient
         fields = ['id', 'amount']
+        list_serializer_class = RecipeIngredientWriteListSerializer
+
+
+class RecipeThumbnailSerializer(serializers.Serializer):
+    image = serializers.SerializerMethodField()
+    image_webp = serializers.SerializerMethodField()
+
+    def get_image(self, obj):
+        request = self.context.get('request')
+        return get_image_variant_url(
+            obj.image_variants, 'thumbnail', request
+        ) or get_file_url(obj.image, request)
+
+    def get_image_webp(self, obj):
+        return get_image_variant_url(
+            obj.image_variants, 'thumbnail_webp', self.context.get('request')
+        )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(FragmentCacheMixin, serializers.ModelSerializer):
     author = UserGetSerializer(read_only=True)
     ingredients = RecipeIngredientReadSerializer(
         source='recipe_ingredients', many=True, read_only=True
     )
     image = Base64ImageField()
+    image_webp = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    live_fields = ('author', 'is_favorited', 'is_in_shopping_cart')
+    fragment_prefetch = ('recipe_ingredients__ingredient',)
 
     class Meta:
         model = Recipe
         fields = [
             'id', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_webp', 'text',
+            'cooking_time'
         ]
+        list_serializer_class = FragmentListSerializer
+
+    def get_image_webp(self, obj):
+        return get_image_variant_url(
+            obj.image_variants, 'webp', self.context.get('request')
+        )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_authenticated:
             return user.favorites.filter(recipe=obj).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_authenticated:
             return user.shopping_cart_items.filter(recipe=obj).exists()
         return False
 
 
+class RecipeListSerializer(RecipeThumbnailSerializer, RecipeSerializer):
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        if hasattr(instance, 'search_snippet'):
+            representation['search_snippet'] = format_snippet(
+                instance.search_snippet
+            )
+        return representation
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientWriteSerializer(many=True)
     image = Base64ImageField(required=True, allow_null=False)
@@ -195,13 +287,18 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ) for item in ingredients_data
         ]
         RecipeIngredient.objects.bulk_create(objs)
+        Ingredient.objects.filter(
+            pk__in=[obj.ingredient.pk for obj in objs]
+        ).update(recipes_count=models.F('recipes_count') + 1)
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(
-            author=self.context['request'].user, **validated_data
-        )
-        self.create_ingredients(ingredients_data, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(
+                author=self.context['request'].user, **validated_data
+            )
+            self.create_ingredients(ingredients_data, recipe)
+            request_similarity_refresh([recipe.pk])
         return recipe
 
     def update(self, instance, validated_data):
@@ -211,10 +308,46 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 'ingredients': 'Это поле обязательно.'
             })
 
-        instance.recipe_ingredients.all().delete()
-        self.create_ingredients(ingredients_data, instance)
-
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            if self.update_ingredients(instance, ingredients_data):
+                request_similarity_refresh([instance.pk])
+            return super().update(instance, validated_data)
+
+    def update_ingredients(self, instance, ingredients_data):
+        existing = {
+            row.ingredient_id: row
+            for row in instance.recipe_ingredients.all()
+        }
+        old_amounts = {pk: row.amount for pk, row in existing.items()}
+        new_amounts = {
+            item['id'].id: item['amount'] for item in ingredients_data
+        }
+        removed = {
+            pk: row.pk for pk, row in existing.items() if pk not in new_amounts
+        }
+        changed = []
+        for pk, amount in new_amounts.items():
+            if pk in existing and existing[pk].amount != amount:
+                existing[pk].amount = amount
+                changed.append(existing[pk])
+        if removed:
+            RecipeIngredient.objects.filter(
+                pk__in=removed.values()
+            )._raw_delete(RecipeIngredient.objects.db)
+            Ingredient.objects.filter(
+                pk__in=removed, recipes_count__gt=0
+            ).update(recipes_count=models.F('recipes_count') - 1)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(
+            [item for item in ingredients_data
+             if item['id'].id not in existing],
+            instance
+        )
+        update_recipe_in_shopping_cart_totals(
+            instance, old_amounts, new_amounts
+        )
+        return old_amounts.keys() != new_amounts.keys()
 
     def to_representation(self, instance):
         return RecipeSerializer(instance, context=self.context).data
@@ -244,12 +377,12 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
-
+class ShortRecipeSerializer(
+    RecipeThumbnailSerializer, serializers.ModelSerializer
+):
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_webp', 'cooking_time')
 
 
 class SubscriptionReadSerializer(serializers.ModelSerializer):
@@ -271,20 +404,47 @@ class SubscriptionReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return request.user.subscriptions.filter(author=obj.author).exists()
+        return obj.author_id in get_subscribed_author_ids(self.context)
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(author=obj.author)
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit') if request else None
-        if limit:
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj.author, 'limited_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(author=obj.author)
+            limit = get_recipes_limit(self.context.get('request'))
+            if limit is not None:
+                recipes = recipes[:limit]
         return ShortRecipeSerializer(
             recipes, many=True, context=self.context
         ).data
 
     def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
+        return obj.author.recipes_count
+
+
+class ShoppingCartExportCreateSerializer(serializers.Serializer):
+    format = serializers.ChoiceField(
+        choices=ShoppingCartExport.Format.choices,
+        default=ShoppingCartExport.Format.PDF
+    )
+
+
+class ShoppingCartExportSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShoppingCartExport
+        fields = (
+            'id', 'format', 'status', 'error', 'created_at', 'finished_at',
+            'download_url'
+        )
+        read_only_fields = fields
+
+    def get_download_url(self, export):
+        if export.status != ShoppingCartExport.Status.DONE:
+            return None
+        url = reverse(
+            'api:recipe-download-shopping-cart-export',
+            kwargs={'export_id': export.pk}
+        )
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+
+from recipes.models import RecipeIngredient, ShoppingCartIngredient
+from .caching import get_version, invalidate_versions
+
+STREAM_CHUNK_SIZE = 64 * 1024
+CART_VERSION_KEY = 'shopping_cart_version:{}'
+ALL_CARTS_VERSION_KEY = CART_VERSION_KEY.format('all')
+CART_CACHE_KEY = 'shopping_cart:{}:{}:{}:{}'
+
+
+def get_shopping_cart_ingredients(user):
+    return (
+        ShoppingCartIngredient.objects
+        .filter(user=user)
+        .values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'total_amount'
+        )
+        .order_by('ingredient__name')
+    )
+
+
+def get_live_shopping_cart_totals():
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__user_shopping_cart__isnull=False)
+        .values_list('recipe__user_shopping_cart__user', 'ingredient')
+        .annotate(total_amount=models.Sum('amount'))
+        .order_by()
+    )
+
+
+def get_recipe_amounts(recipe_id):
+    return dict(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+def apply_shopping_cart_deltas(user_ids, deltas):
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    with transaction.atomic():
+        ShoppingCartIngredient.objects.bulk_create(
+            [
+                ShoppingCartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    total_amount=0
+                )
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items()
+                if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+        rows = ShoppingCartIngredient.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+        to_update = list(
+            rows.select_for_update().only('pk', 'ingredient_id')
+        )
+        for row in to_update:
+            row.total_amount = (
+                models.F('total_amount') + deltas[row.ingredient_id]
+            )
+        ShoppingCartIngredient.objects.bulk_update(
+            to_update, ['total_amount']
+        )
+        if any(delta < 0 for delta in deltas.values()):
+            rows.filter(total_amount__lte=0).delete()
+
+
+def add_recipe_to_shopping_cart_totals(cart_item):
+    apply_shopping_cart_deltas(
+        [cart_item.user_id], get_recipe_amounts(cart_item.recipe_id)
+    )
+
+
+def remove_recipe_from_shopping_cart_totals(cart_item):
+    apply_shopping_cart_deltas([cart_item.user_id], {
+        pk: -amount
+        for pk, amount in get_recipe_amounts(cart_item.recipe_id).items()
+    })
+
+
+def update_recipe_in_shopping_cart_totals(recipe, old_amounts, new_amounts):
+    apply_shopping_cart_deltas(
+        recipe.user_shopping_cart.values_list('user_id', flat=True),
+        {
+            pk: new_amounts.get(pk, 0) - old_amounts.get(pk, 0)
+            for pk in old_amounts.keys() | new_amounts.keys()
+        }
+    )
+
+
+def rebuild_shopping_cart_totals(batch_size=1000):
+    with transaction.atomic():
+        ShoppingCartIngredient.objects.all().delete()
+        created = 0
+        batch = []
+        for user_id, ingredient_id, total_amount in (
+            get_live_shopping_cart_totals().iterator()
+        ):
+            batch.append(ShoppingCartIngredient(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total_amount
+            ))
+            if len(batch) >= batch_size:
+                ShoppingCartIngredient.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ShoppingCartIngredient.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+def find_shopping_cart_total_mismatches():
+    expected = {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount
+        in get_live_shopping_cart_totals().iterator()
+    }
+    actual = {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount
+        in ShoppingCartIngredient.objects.values_list(
+            'user_id', 'ingredient_id', 'total_amount'
+        ).iterator()
+    }
+    return [
+        (*key, expected.get(key), actual.get(key))
+        for key in sorted(expected.keys() | actual.keys())
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+def iter_chunks(content, chunk_size=STREAM_CHUNK_SIZE):
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+
+
+def get_shopping_cart_cache_key(user_id, renderer):
+    return CART_CACHE_KEY.format(
+        renderer.format,
+        user_id,
+        get_version(CART_VERSION_KEY.format(user_id)),
+        get_version(ALL_CARTS_VERSION_KEY),
+    )
+
+
+def get_cached_shopping_cart(user, renderer):
+    return cache.get(get_shopping_cart_cache_key(user.id, renderer))
+
+
+def stream_shopping_cart(user, renderer):
+    if not renderer.cacheable:
+        return renderer.stream(
+            get_shopping_cart_ingredients(user).iterator()
+        )
+    cache_key = get_shopping_cart_cache_key(user.id, renderer)
+    content = cache.get(cache_key)
+    if content is None:
+        content = b''.join(
+            renderer.stream(get_shopping_cart_ingredients(user))
+        )
+        cache.set(
+            cache_key, content, settings.SHOPPING_CART_CACHE_TIMEOUT
+        )
+    return iter_chunks(content)
+
+
+def invalidate_shopping_carts(user_ids):
+    invalidate_versions(CART_VERSION_KEY.format(pk) for pk in user_ids)
+
+
+def invalidate_all_shopping_carts():
+    invalidate_versions([ALL_CARTS_VERSION_KEY])
@@ -0,0 +1,186 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartExport,
+    SimilarityRefresh,
+)
+from users.models import PROFILE_FIELDS, Subscription
+from .autocomplete import ingredient_index
+from .caching import invalidate_personal_versions
+from .feed import fan_out_recipes, follow_author, unfollow_author
+from .images import link_image_variants
+from .recipe_index import recipe_ingredient_index
+from .similarity import request_similarity_refresh
+from .recipe_cache import (
+    invalidate_favorites_ordering,
+    invalidate_recipe_responses,
+)
+from .shopping_cart import (
+    add_recipe_to_shopping_cart_totals,
+    invalidate_all_shopping_carts,
+    invalidate_shopping_carts,
+    remove_recipe_from_shopping_cart_totals,
+)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_shopping_carts(**kwargs):
+    invalidate_all_shopping_carts()
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_shopping_cart(instance, **kwargs):
+    invalidate_shopping_carts([instance.user_id])
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe_shopping_carts(instance, created, **kwargs):
+    if created:
+        return
+    invalidate_shopping_carts(
+        instance.user_shopping_cart.values_list('user_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_shopping_cart_totals(instance, created, **kwargs):
+    if created:
+        add_recipe_to_shopping_cart_totals(instance)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_shopping_cart_totals(instance, **kwargs):
+    remove_recipe_from_shopping_cart_totals(instance)
+
+
+@receiver(post_delete, sender=ShoppingCartExport)
+def delete_shopping_cart_export_file(instance, **kwargs):
+    if instance.file:
+        transaction.on_commit(
+            lambda: instance.file.delete(save=False)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_response(instance, **kwargs):
+    invalidate_recipe_responses([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredient_response(instance, **kwargs):
+    invalidate_recipe_responses([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_recipe_responses(instance, **kwargs):
+    invalidate_recipe_responses(
+        RecipeIngredient.objects.filter(
+            ingredient_id=instance.pk
+        ).values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_author_recipe_responses(instance, created, update_fields,
+                                       **kwargs):
+    if created or (
+        update_fields is not None
+        and not PROFILE_FIELDS.intersection(update_fields)
+    ):
+        return
+    invalidate_recipe_responses(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_favorites_ordered_responses(**kwargs):
+    invalidate_favorites_ordering()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_personal_version(instance, **kwargs):
+    invalidate_personal_versions([instance.user_id])
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscriber_personal_version(instance, **kwargs):
+    invalidate_personal_versions([instance.subscriber_id])
+
+
+@receiver(post_save, sender=Recipe)
+def request_recipe_image_variants(instance, update_fields, **kwargs):
+    if update_fields is None or 'image' in update_fields:
+        link_image_variants(Recipe, instance, 'image', 'image_variants')
+
+
+@receiver(post_save, sender=get_user_model())
+def request_avatar_variants(instance, update_fields, **kwargs):
+    if update_fields is None or 'avatar' in update_fields:
+        link_image_variants(
+            get_user_model(), instance, 'avatar', 'avatar_variants'
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        fan_out_recipes([instance])
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_subscriber_timeline(instance, created, **kwargs):
+    if created:
+        follow_author(instance.subscriber_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_subscriber_timeline(instance, **kwargs):
+    unfollow_author(instance.subscriber_id, instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def refresh_recipe_ingredient_index(**kwargs):
+    transaction.on_commit(recipe_ingredient_index.mark_changed)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Ingredient)
+def rebuild_recipe_ingredient_index(**kwargs):
+    transaction.on_commit(recipe_ingredient_index.invalidate)
+
+
+@receiver(pre_delete, sender=Recipe)
+def refill_deleted_recipe_similarity(instance, **kwargs):
+    request_similarity_refresh(
+        instance.similar_to.exclude(recipe_id=instance.pk).values_list(
+            'recipe_id', flat=True
+        ),
+        SimilarityRefresh.Kind.REFILL,
+    )
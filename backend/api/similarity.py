@@ -0,0 +1,214 @@
+import heapq
+import logging
+from collections import Counter
+from itertools import chain, groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from recipes.models import RecipeIngredient, SimilarRecipe, SimilarityRefresh
+from .jobs import claim_next_job, finish_job
+
+logger = logging.getLogger(__name__)
+
+
+def load_recipe_ingredients(queryset):
+    rows = queryset.order_by('recipe_id').values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator()
+    return {
+        recipe_id: frozenset(map(itemgetter(1), group))
+        for recipe_id, group in groupby(rows, key=itemgetter(0))
+    }
+
+
+def build_postings(recipes):
+    postings = {}
+    for recipe_id, ingredients in recipes.items():
+        for ingredient_id in ingredients:
+            postings.setdefault(ingredient_id, []).append(recipe_id)
+    return postings
+
+
+def jaccard(overlap, size, other_size):
+    return overlap / (size + other_size - overlap)
+
+
+def top_similar(recipe_id, scores, count):
+    return heapq.nlargest(
+        count,
+        (
+            (score, other_id) for other_id, score in scores
+            if other_id != recipe_id
+        )
+    )
+
+
+def find_similar(recipe_id, ingredients, postings, sizes, count):
+    overlaps = Counter(chain.from_iterable(
+        postings.get(ingredient_id, ()) for ingredient_id in ingredients
+    ))
+    return top_similar(recipe_id, (
+        (other_id, jaccard(overlap, len(ingredients), sizes[other_id]))
+        for other_id, overlap in overlaps.items()
+    ), count)
+
+
+def build_similar_rows(recipe_ids, recipes, postings, sizes, count):
+    return [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=other_id, score=score)
+        for recipe_id in recipe_ids
+        for score, other_id in find_similar(
+            recipe_id, recipes[recipe_id], postings, sizes, count
+        )
+    ]
+
+
+def get_overlap_scores(recipe_id, ingredients):
+    sizes = RecipeIngredient.objects.filter(
+        recipe_id=models.OuterRef('recipe_id')
+    ).order_by().values('recipe_id').annotate(
+        size=models.Count('pk')
+    ).values('size')
+    return [
+        (other_id, jaccard(overlap, len(ingredients), size))
+        for other_id, overlap, size in RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredients
+        ).exclude(recipe_id=recipe_id).order_by().values(
+            'recipe_id'
+        ).annotate(
+            overlap=models.Count('pk'), size=models.Subquery(sizes)
+        ).values_list('recipe_id', 'overlap', 'size')
+    ]
+
+
+def get_similar_rows(recipe_ids, count):
+    recipes = load_recipe_ingredients(
+        RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+    )
+    return [
+        SimilarRecipe(recipe_id=owner_id, similar_id=other_id, score=score)
+        for owner_id, ingredients in recipes.items()
+        for score, other_id in top_similar(
+            owner_id, get_overlap_scores(owner_id, ingredients), count
+        )
+    ]
+
+
+def get_reverse_neighbours(recipe_id, neighbours, count):
+    lists = {}
+    owners = set()
+    for owner_id, similar_id, pk, score in SimilarRecipe.objects.filter(
+        models.Q(recipe_id__in=[other_id for _, other_id in neighbours])
+        | models.Q(similar_id=recipe_id)
+    ).values_list('recipe_id', 'similar_id', 'pk', 'score'):
+        if similar_id == recipe_id:
+            owners.add(owner_id)
+        else:
+            lists.setdefault(owner_id, []).append((score, pk))
+    created = []
+    trimmed = []
+    for score, owner_id in neighbours:
+        current = sorted(lists.get(owner_id, []), reverse=True)
+        if len(current) >= count and current[count - 1][0] >= score:
+            continue
+        created.append(SimilarRecipe(
+            recipe_id=owner_id, similar_id=recipe_id, score=score
+        ))
+        trimmed.extend(pk for _, pk in current[count - 1:])
+    stale = owners - {row.recipe_id for row in created}
+    return created, trimmed, stale
+
+
+def refresh_similar_recipes(recipe_id, count):
+    ingredients = set(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+            'ingredient_id', flat=True
+        )
+    )
+    neighbours = top_similar(
+        recipe_id, get_overlap_scores(recipe_id, ingredients), count
+    ) if ingredients else []
+    created, trimmed, stale = get_reverse_neighbours(
+        recipe_id, neighbours, count
+    )
+    refilled = get_similar_rows(stale, count) if stale else []
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            models.Q(recipe_id=recipe_id) | models.Q(similar_id=recipe_id)
+            | models.Q(pk__in=trimmed) | models.Q(recipe_id__in=stale)
+        ).delete()
+        SimilarRecipe.objects.bulk_create(
+            [
+                SimilarRecipe(recipe_id=recipe_id, similar_id=other_id,
+                              score=score)
+                for score, other_id in neighbours
+            ] + created + refilled,
+            ignore_conflicts=True,
+        )
+    return neighbours
+
+
+def refill_similar_recipes(recipe_ids, count):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    rows = get_similar_rows(recipe_ids, count)
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def request_similarity_refresh(recipe_ids,
+                               kind=SimilarityRefresh.Kind.REFRESH):
+    recipe_ids = set(recipe_ids)
+    queued = set(SimilarityRefresh.objects.filter(
+        recipe_id__in=recipe_ids,
+        kind=kind,
+        status=SimilarityRefresh.Status.PENDING,
+    ).values_list('recipe_id', flat=True))
+    SimilarityRefresh.objects.bulk_create([
+        SimilarityRefresh(recipe_id=recipe_id, kind=kind)
+        for recipe_id in recipe_ids - queued
+    ])
+
+
+def claim_next_similarity_refresh():
+    return claim_next_job(SimilarityRefresh.objects.all())
+
+
+def process_similarity_refresh(job):
+    count = settings.SIMILAR_RECIPES_COUNT
+    try:
+        if job.kind == SimilarityRefresh.Kind.REFILL:
+            refill_similar_recipes([job.recipe_id], count)
+        else:
+            refresh_similar_recipes(job.recipe_id, count)
+    except Exception as error:
+        logger.exception(
+            'Не удалось пересчитать похожие рецепты для %s', job.recipe_id
+        )
+        job.status = SimilarityRefresh.Status.FAILED
+        job.error = str(error)
+    else:
+        job.status = SimilarityRefresh.Status.DONE
+    job.finished_at = timezone.now()
+    if (
+        finish_job(job, 'status', 'error', 'finished_at')
+        and job.status == SimilarityRefresh.Status.DONE
+    ):
+        job.delete()
+    return job
+
+
+def process_pending_similarity(limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_similarity_refresh()
+        if job is None:
+            break
+        process_similarity_refresh(job)
+        processed += 1
+    return processed
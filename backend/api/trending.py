@@ -0,0 +1,56 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import TruncHour
+
+from recipes.models import Favorite, ShoppingCart, TrendingScore
+from .recipe_cache import invalidate_trending_ordering
+
+TRENDING_ORDERING = 'trending'
+
+
+def get_trending_sources():
+    return (
+        (Favorite, 1.0),
+        (ShoppingCart, settings.TRENDING_SHOPPING_CART_WEIGHT),
+    )
+
+
+def compute_trending_scores(now):
+    decay = math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+    since = now - timedelta(days=settings.TRENDING_HORIZON_DAYS)
+    scores = defaultdict(float)
+    for model, weight in get_trending_sources():
+        for recipe_id, hour, count in model.objects.filter(
+            created_at__gte=since
+        ).annotate(hour=TruncHour('created_at')).order_by().values(
+            'recipe_id', 'hour'
+        ).annotate(count=models.Count('pk')).values_list(
+            'recipe_id', 'hour', 'count'
+        ).iterator():
+            age = max((now - hour).total_seconds(), 0)
+            scores[recipe_id] += weight * count * math.exp(-decay * age)
+    return scores
+
+
+def store_trending_scores(scores, now, batch_size):
+    with transaction.atomic():
+        TrendingScore.objects.all().delete()
+        TrendingScore.objects.bulk_create(
+            [
+                TrendingScore(recipe_id=recipe_id, score=score,
+                              computed_at=now)
+                for recipe_id, score in scores.items()
+            ],
+            batch_size=batch_size,
+        )
+    invalidate_trending_ordering()
+
+
+def order_by_trending(queryset):
+    return queryset.annotate(
+        trending=models.F('trending_score__score')
+    ).order_by(models.F('trending').desc(nulls_last=True), '-id')
@@ -1,15 +1,12 @@
-import os
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
-from django.db import models
-from django.http import HttpResponse
+from django.db import models, transaction
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
@@ -18,37 +15,86 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from recipes.models import (
-    Ingredient, Recipe, RecipeIngredient, ShoppingCart, Favorite)
-from .filters import RecipeFilter
+    Ingredient, Recipe, ShoppingCart, ShoppingCartExport, Favorite)
+from .autocomplete import INGREDIENT_INDEX_VERSION_KEY, ingredient_index
+from .caching import (
+    AnonymousResponseCacheMixin,
+    ConditionalGetMixin,
+    VersionedConditionalGetMixin,
+    get_personal_version_key,
+    get_version,
+    get_version_timestamp,
+)
+from .exports import (
+    EXPORT_RENDERERS,
+    get_or_create_export,
+    prefers_async_export,
+    requires_background_export,
+)
+from .filters import RecipeFilter, RecipeOrderingFilter, search_by_name
+from .feed import get_timeline_page
+from .pagination import (
+    CustomPageNumberPagination,
+    KeysetPagination,
+    TimelinePagination,
+)
 from .permissions import IsAuthorOrReadOnly
+from .recipe_cache import (
+    get_recipe_list_version_keys,
+    get_recipe_version_keys,
+)
+from .renderers import SHOPPING_CART_RENDERERS
+from .shopping_cart import stream_shopping_cart
 from .serializers import (
     AvatarUpdateSerializer,
     IngredientSerializer,
     SubscriptionCreateSerializer,
     SubscriptionReadSerializer,
     UserGetSerializer,
+    RecipeListSerializer,
     RecipeSerializer,
     RecipeCreateSerializer,
     ShortRecipeSerializer,
+    ShoppingCartExportCreateSerializer,
+    ShoppingCartExportSerializer,
+    get_recipes_limit,
 )
 
 User = get_user_model()
 
 
-TITLE_FONT = "DejaVuSans"
-TITLE_FONT_SIZE = 16
-TEXT_FONT = "DejaVuSans"
-TEXT_FONT_SIZE = 12
-MARGIN_TOP = 50
-MARGIN_LEFT = 50
-LINE_HEIGHT = 20
-TITLE_LINE_HEIGHT = 30
-MARGIN_BOTTOM = 50
-
-
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ConditionalGetMixin, DjoserUserViewSet):
     serializer_class = UserGetSerializer
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('avatar_variants')
+    conditional_actions = ('list', 'retrieve', 'me')
+
+    def get_validators(self):
+        user = self.request.user
+        if self.action == 'me':
+            state = {'last': user.updated_at, 'count': 1}
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            if self.action == 'retrieve':
+                lookup = self.kwargs[self.lookup_field]
+                if not str(lookup).isdigit():
+                    return None
+                queryset = queryset.filter(pk=lookup)
+            state = queryset.aggregate(
+                last=models.Max('updated_at'), count=models.Count('pk')
+            )
+        if state['last'] is None:
+            return None
+        parts = [state['last'].isoformat(), state['count']]
+        last_modified = int(state['last'].timestamp())
+        if user.is_authenticated:
+            version = get_version(get_personal_version_key(user.pk))
+            parts.append(version)
+            last_modified = max(
+                last_modified, get_version_timestamp(version)
+            )
+        if self.action == 'list':
+            last_modified = None
+        return parts, last_modified
 
     @action(
         detail=False,
@@ -91,7 +137,8 @@ class UserViewSet(DjoserUserViewSet):
                 context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            subscription = serializer.save()
+            with transaction.atomic():
+                subscription = serializer.save()
             read_serializer = SubscriptionReadSerializer(
                 subscription, context={'request': request}
             )
@@ -103,7 +150,8 @@ class UserViewSet(DjoserUserViewSet):
                 {'errors': 'Подписка не существует.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        subscription.delete()
+        with transaction.atomic():
+            subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -113,7 +161,28 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = user.subscriptions.select_related('author')
+        recipes = Recipe.objects.select_related('image_variants')
+        limit = get_recipes_limit(request)
+        if limit is not None:
+            recipes = recipes.filter(
+                pk__in=models.Subquery(
+                    Recipe.objects
+                    .filter(author=models.OuterRef('author'))
+                    .values('pk')[:limit]
+                )
+            )
+        queryset = (
+            user.subscriptions
+            .select_related('author')
+            .order_by('id')
+            .prefetch_related(
+                models.Prefetch(
+                    'author__recipes',
+                    queryset=recipes,
+                    to_attr='limited_recipes'
+                )
+            )
+        )
         page = self.paginate_queryset(queryset)
         serializer = SubscriptionReadSerializer(
             page, many=True, context={'request': request}
@@ -128,12 +197,15 @@ class UserViewSet(DjoserUserViewSet):
         return super().me(request, *args, **kwargs)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(VersionedConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
+    def get_version_keys(self):
+        return [INGREDIENT_INDEX_VERSION_KEY]
+
     def get_queryset(self):
         queryset = super().get_queryset()
         name_param = self.request.query_params.get('name')
@@ -141,17 +213,84 @@ class IngredientViewSet(ReadOnlyModelViewSet):
             queryset = queryset.filter(name__istartswith=name_param)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            self.list_ingredients, request, *args, **kwargs
+        )
+
+    def list_ingredients(self, request, *args, **kwargs):
+        search_param = request.query_params.get('search')
+        if search_param:
+            queryset = search_by_name(
+                self.get_queryset(), search_param
+            )[:settings.INGREDIENTS_SEARCH_LIMIT]
+            return Response(self.get_serializer(queryset, many=True).data)
+        name_param = request.query_params.get('name')
+        if name_param:
+            return Response(ingredient_index.search(
+                name_param, settings.INGREDIENTS_SEARCH_LIMIT
+            ))
+        return Response(ingredient_index.all())
+
 
-class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.all().prefetch_related(
-        'recipe_ingredients__ingredient'
+class RecipeViewSet(AnonymousResponseCacheMixin, ModelViewSet):
+    queryset = Recipe.objects.select_related(
+        'author', 'author__avatar_variants', 'image_variants'
     )
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, RecipeOrderingFilter]
     filterset_class = RecipeFilter
+    ordering_fields = ['publication_date', 'favorites_count', 'cooking_time']
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.is_requested(self.request):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = CustomPageNumberPagination()
+        return self._paginator
+
+    def get_version_keys(self):
+        if self.action == 'retrieve':
+            keys = get_recipe_version_keys(self.kwargs[self.lookup_field])
+        else:
+            keys = get_recipe_list_version_keys(
+                self.request.query_params.get('ordering', '')
+            )
+        if self.request.user.is_authenticated:
+            keys.append(get_personal_version_key(self.request.user.pk))
+        return keys
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return queryset.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+        )
 
     def get_permissions(self):
         if self.action in [
-            'create', 'favorite', 'shopping_cart', 'download_shopping_cart'
+            'create', 'favorite', 'shopping_cart', 'download_shopping_cart',
+            'create_shopping_cart_export', 'feed', 'shopping_cart_export',
+            'download_shopping_cart_export'
         ]:
             self.permission_classes = [IsAuthenticated]
         elif self.action in ['partial_update', 'update', 'destroy']:
@@ -165,11 +304,41 @@ class RecipeViewSet(ModelViewSet):
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
             return RecipeCreateSerializer
+        if self.action in ('list', 'feed', 'similar'):
+            return RecipeListSerializer
         return RecipeSerializer
 
     def perform_create(self, serializer):
         serializer.save()
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        paginator = TimelinePagination()
+        recipe_ids = paginator.paginate_timeline(
+            lambda cursor, limit: get_timeline_page(
+                request.user, cursor, limit
+            ),
+            Recipe, request
+        )
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        recipes = self.get_queryset().filter(
+            similar_to__recipe=recipe
+        ).order_by('-similar_to__score', '-id')
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=['get'],
@@ -190,7 +359,8 @@ class RecipeViewSet(ModelViewSet):
         if request.method == 'POST':
             if user.shopping_cart_items.filter(recipe=recipe).exists():
                 raise ValidationError('Рецепт уже в корзине.')
-            ShoppingCart.objects.create(user=user, recipe=recipe)
+            with transaction.atomic():
+                ShoppingCart.objects.create(user=user, recipe=recipe)
             serializer = ShortRecipeSerializer(
                 recipe, context={'request': request}
             )
@@ -198,63 +368,101 @@ class RecipeViewSet(ModelViewSet):
         cart_item = user.shopping_cart_items.filter(recipe=recipe)
         if not cart_item.exists():
             raise ValidationError('Рецепта нет в корзине.')
-        cart_item.delete()
+        with transaction.atomic():
+            cart_item.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_CART_RENDERERS
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = (
-            RecipeIngredient.objects
-            .filter(recipe__user_shopping_cart__user=user)
-            .values(
-                'ingredient__name',
-                'ingredient__measurement_unit'
-            )
-            .annotate(total_amount=models.Sum('amount'))
-            .order_by('ingredient__name')
-        )
-        font_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            'static',
-            'fonts',
-            'DejaVuSans.ttf'
+        renderer = request.accepted_renderer
+        if prefers_async_export(request) and requires_background_export(
+            request.user, renderer
+        ):
+            export = get_or_create_export(request.user, renderer)
+            if export.status == ShoppingCartExport.Status.DONE:
+                return self._export_file_response(export)
+            return self._export_accepted_response(export)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            stream_shopping_cart(request.user, renderer),
+            content_type=content_type
         )
-        pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
-        response = HttpResponse(content_type='application/pdf')
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.pdf"'
+            f'attachment; filename="shopping_cart.{renderer.format}"'
         )
-        p = canvas.Canvas(response, pagesize=A4)
-        width, height = A4
-        y = height - MARGIN_TOP
-        p.setFont(TITLE_FONT, TITLE_FONT_SIZE)
-        p.drawString(MARGIN_LEFT, y, "Список покупок")
-        y -= TITLE_LINE_HEIGHT
-        p.setFont(TEXT_FONT, TEXT_FONT_SIZE)
-        if not ingredients:
-            p.drawString(MARGIN_LEFT, y, "Корзина пуста.")
-        else:
-            for idx, item in enumerate(ingredients, 1):
-                line = (
-                    f"{idx}. {item['ingredient__name']} "
-                    f"- {item['total_amount']} "
-                    f"{item['ingredient__measurement_unit']}"
-                )
-                p.drawString(MARGIN_LEFT, y, line)
-                y -= LINE_HEIGHT
-                if y < MARGIN_BOTTOM:
-                    p.showPage()
-                    y = height - MARGIN_TOP
-                    p.setFont(TEXT_FONT, TEXT_FONT_SIZE)
-        p.showPage()
-        p.save()
         return response
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='shopping_cart_exports',
+        permission_classes=[IsAuthenticated]
+    )
+    def create_shopping_cart_export(self, request):
+        serializer = ShoppingCartExportCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        renderer = EXPORT_RENDERERS[serializer.validated_data['format']]()
+        export = get_or_create_export(request.user, renderer)
+        return self._export_accepted_response(export)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'shopping_cart_exports/(?P<export_id>\d+)',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_export(self, request, export_id=None):
+        export = get_object_or_404(
+            request.user.shopping_cart_exports, pk=export_id
+        )
+        return Response(ShoppingCartExportSerializer(
+            export, context={'request': request}
+        ).data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'shopping_cart_exports/(?P<export_id>\d+)/download',
+        permission_classes=[IsAuthenticated]
+    )
+    def download_shopping_cart_export(self, request, export_id=None):
+        export = get_object_or_404(
+            request.user.shopping_cart_exports,
+            pk=export_id,
+            status=ShoppingCartExport.Status.DONE
+        )
+        return self._export_file_response(export)
+
+    def _export_accepted_response(self, export):
+        data = ShoppingCartExportSerializer(
+            export, context={'request': self.request}
+        ).data
+        status_url = self.request.build_absolute_uri(reverse(
+            'api:recipe-shopping-cart-export',
+            kwargs={'export_id': export.pk}
+        ))
+        return JsonResponse(
+            data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': status_url}
+        )
+
+    def _export_file_response(self, export):
+        renderer = EXPORT_RENDERERS[export.format]
+        return FileResponse(
+            export.file.open('rb'),
+            as_attachment=True,
+            filename=f'shopping_cart.{export.format}',
+            content_type=renderer.media_type
+        )
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -266,7 +474,8 @@ class RecipeViewSet(ModelViewSet):
         if request.method == 'POST':
             if user.favorites.filter(recipe=recipe).exists():
                 raise ValidationError('Рецепт уже в избранном.')
-            Favorite.objects.create(user=user, recipe=recipe)
+            with transaction.atomic():
+                Favorite.objects.create(user=user, recipe=recipe)
             serializer = ShortRecipeSerializer(
                 recipe, context={'request': request}
             )
@@ -274,5 +483,6 @@ class RecipeViewSet(ModelViewSet):
         favorite = user.favorites.filter(recipe=recipe)
         if not favorite.exists():
             raise ValidationError('Рецепта нет в избранном.')
-        favorite.delete()
+        with transaction.atomic():
+            favorite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -79,6 +80,24 @@ DATABASES = {
     }
 }
 
+if os.getenv('USE_SQLITE', 'False').lower() == 'true':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -121,6 +140,32 @@ AUTH_USER_MODEL = 'users.User'
 
 MAX_PAGE_SIZE = 6
 
+INGREDIENTS_SEARCH_LIMIT = 50
+
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60 * 24
+
+SHOPPING_CART_SYNC_LIMIT = 100
+
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+IMAGE_THUMBNAIL_SIZE = (480, 480)
+
+IMAGE_WEBP_QUALITY = 80
+
+JOB_LEASE_TIMEOUT = 60 * 10
+
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+
+SIMILAR_RECIPES_COUNT = 10
+
+TRENDING_HALF_LIFE_HOURS = 72
+
+TRENDING_HORIZON_DAYS = 30
+
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from api.similarity import request_similarity_refresh
 from .models import Ingredient, Recipe, RecipeIngredient
 
 
@@ -25,9 +27,17 @@ class RecipeAdmin(admin.ModelAdmin):
     ordering = ("name",)
     inlines = [RecipeIngredientInline]
 
-    @admin.display(description="В избранном у пользователей")
+    @admin.display(
+        description="В избранном у пользователей",
+        ordering="favorites_count"
+    )
     def favorites_count(self, recipe):
-        return recipe.favorite_recipes.count()
+        return recipe.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if not change or any(formset.has_changed() for formset in formsets):
+            request_similarity_refresh([form.instance.pk])
 
 
 @admin.register(Ingredient)
@@ -37,6 +47,6 @@ class IngredientAdmin(admin.ModelAdmin):
     list_filter = ("measurement_unit", )
     ordering = ("name",)
 
-    @admin.display(description="Число рецептов")
+    @admin.display(description="Число рецептов", ordering="recipes_count")
     def recipe_count(self, ingredient):
-        return ingredient.recipe_ingredients.count()
+        return ingredient.recipes_count
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RecipesConfig(AppConfig):
@@ -6,3 +7,8 @@ class RecipesConfig(AppConfig):
     name = 'recipes'
 
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search_indexes import create_search_indexes
+        post_migrate.connect(create_search_indexes, sender=self)
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.similarity import (
+    build_postings,
+    build_similar_rows,
+    load_recipe_ingredients,
+)
+from recipes.models import RecipeIngredient, SimilarRecipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает похожие рецепты по сходству наборов ингредиентов "
+        "(коэффициент Жаккара)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=settings.SIMILAR_RECIPES_COUNT,
+            help="Число похожих рецептов, сохраняемых для каждого рецепта"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Число рецептов, обрабатываемых и записываемых за раз"
+        )
+
+    def handle(self, *args, **options):
+        if options["top"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("Параметры должны быть положительными")
+        start = time.perf_counter()
+        recipes = load_recipe_ingredients(RecipeIngredient.objects.all())
+        postings = build_postings(recipes)
+        sizes = {
+            recipe_id: len(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        }
+        recipe_ids = sorted(recipes)
+        chunk_size = options["chunk_size"]
+        created = 0
+        with transaction.atomic():
+            SimilarRecipe.objects.all().delete()
+            for offset in range(0, len(recipe_ids), chunk_size):
+                rows = build_similar_rows(
+                    recipe_ids[offset:offset + chunk_size],
+                    recipes, postings, sizes, options["top"]
+                )
+                SimilarRecipe.objects.bulk_create(rows, batch_size=chunk_size)
+                created += len(rows)
+                self.stdout.write(
+                    "Обработано рецептов: "
+                    f"{min(offset + chunk_size, len(recipe_ids))} "
+                    f"из {len(recipe_ids)}"
+                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Записано {created} пар похожих рецептов "
+                f"за {time.perf_counter() - start:.2f} с."
+            )
+        )
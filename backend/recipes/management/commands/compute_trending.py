@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.trending import compute_trending_scores, store_trending_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает популярность рецептов по добавлениям в избранное "
+        "и корзину с затуханием по времени"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Число строк, записываемых в базу за один запрос"
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пачки должен быть положительным")
+        start = time.perf_counter()
+        now = timezone.now()
+        scores = compute_trending_scores(now)
+        store_trending_scores(scores, now, options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Рассчитана популярность {len(scores)} рецептов "
+                f"за {time.perf_counter() - start:.2f} с."
+            )
+        )
@@ -0,0 +1,95 @@
+import json
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe, RecipeIngredient
+
+
+def iter_recipe_batches(batch_size):
+    last_pk = 0
+    while True:
+        recipes = list(
+            Recipe.objects
+            .filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values(
+                "pk", "author__email", "name", "text",
+                "cooking_time", "image"
+            )[:batch_size]
+        )
+        if not recipes:
+            return
+        last_pk = recipes[-1]["pk"]
+        yield recipes
+
+
+def get_recipe_ingredients(recipe_ids):
+    ingredients = defaultdict(list)
+    for recipe_id, name, unit, amount in (
+        RecipeIngredient.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by("pk")
+        .values_list(
+            "recipe_id", "ingredient__name",
+            "ingredient__measurement_unit", "amount"
+        )
+    ):
+        ingredients[recipe_id].append({
+            "name": name, "measurement_unit": unit, "amount": amount
+        })
+    return ingredients
+
+
+class Command(BaseCommand):
+    help = "Выгружает рецепты с ингредиентами в файл JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Путь к файлу выгрузки, по умолчанию стандартный вывод"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Число рецептов, читаемых из базы за один запрос"
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пачки должен быть положительным")
+        path = options["output"]
+        start = time.perf_counter()
+        exported = 0
+        file = (
+            self.stdout if path == "-"
+            else open(path, "w", encoding="utf-8")
+        )
+        try:
+            for recipes in iter_recipe_batches(options["batch_size"]):
+                ingredients = get_recipe_ingredients(
+                    [recipe["pk"] for recipe in recipes]
+                )
+                for recipe in recipes:
+                    file.write(json.dumps({
+                        "author": recipe["author__email"],
+                        "name": recipe["name"],
+                        "text": recipe["text"],
+                        "cooking_time": recipe["cooking_time"],
+                        "image": recipe["image"],
+                        "ingredients": ingredients[recipe["pk"]],
+                    }, ensure_ascii=False) + "\n")
+                exported += len(recipes)
+        finally:
+            if file is not self.stdout:
+                file.close()
+        elapsed = time.perf_counter() - start
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"Выгружено {exported} рецептов за {elapsed:.2f} с "
+                f"({exported / elapsed if elapsed else 0:.0f} рецептов/с)."
+            )
+        )
@@ -0,0 +1,266 @@
+import json
+import sys
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+
+from api.autocomplete import ingredient_index
+from api.feed import fan_out_recipes
+from api.recipe_index import recipe_ingredient_index
+from api.recipe_cache import invalidate_recipe_responses
+from recipes.management.commands.load_ingredients import (
+    MEASUREMENT_UNIT_MAX_LENGTH,
+    iter_batches,
+)
+from recipes.models import (
+    INGREDIENT_NAME_MAX_LENGTH,
+    MAX_COOKING_TIME,
+    MAX_INGREDIENT_AMOUNT,
+    MIN_COOKING_TIME,
+    MIN_INGREDIENT_AMOUNT,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+)
+
+User = get_user_model()
+
+RECIPE_NAME_MAX_LENGTH = Recipe._meta.get_field("name").max_length
+
+
+def check_string(value, error, max_length=None):
+    if (
+        not isinstance(value, str) or not value
+        or max_length is not None and len(value) > max_length
+    ):
+        raise ValueError(error)
+
+
+def parse_recipe(number, line):
+    data = json.loads(line)
+    ingredients = {}
+    for item in data["ingredients"]:
+        amount = int(item["amount"])
+        if not MIN_INGREDIENT_AMOUNT <= amount <= MAX_INGREDIENT_AMOUNT:
+            raise ValueError(f"недопустимое количество {amount}")
+        check_string(
+            item["name"], "недопустимое название ингредиента",
+            INGREDIENT_NAME_MAX_LENGTH
+        )
+        check_string(
+            item["measurement_unit"], "недопустимая единица измерения",
+            MEASUREMENT_UNIT_MAX_LENGTH
+        )
+        ingredients[item["name"]] = (item["measurement_unit"], amount)
+    cooking_time = int(data["cooking_time"])
+    if not MIN_COOKING_TIME <= cooking_time <= MAX_COOKING_TIME:
+        raise ValueError(f"недопустимое время приготовления {cooking_time}")
+    if not ingredients:
+        raise ValueError("нет ингредиентов")
+    check_string(
+        data["name"], "недопустимое название рецепта", RECIPE_NAME_MAX_LENGTH
+    )
+    check_string(data["text"], "недопустимое описание рецепта")
+    return {
+        "line": number,
+        "author": data["author"],
+        "name": data["name"],
+        "text": data["text"],
+        "cooking_time": cooking_time,
+        "image": data["image"],
+        "ingredients": ingredients,
+    }
+
+
+def increment_counters(model, field, counts):
+    by_increment = {}
+    for pk, count in counts.items():
+        by_increment.setdefault(count, []).append(pk)
+    for count, pks in by_increment.items():
+        model.objects.filter(pk__in=pks).update(
+            **{field: models.F(field) + count}
+        )
+
+
+class Command(BaseCommand):
+    help = "Загружает рецепты с ингредиентами из файла JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="Путь к файлу JSON Lines, «-» для стандартного ввода"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Число строк в одном запросе bulk_create"
+        )
+        parser.add_argument(
+            "--transaction-size",
+            type=int,
+            default=5000,
+            help="Число рецептов, записываемых в одной транзакции"
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["transaction_size"] < 1:
+            raise CommandError("Размер пачки должен быть положительным")
+        self.batch_size = options["batch_size"]
+        self.ingredient_ids = dict(
+            Ingredient.objects.values_list("name", "pk")
+        )
+        self.author_ids = {}
+        self.stats = dict(imported=0, skipped=0, ingredients=0)
+        path = options["path"]
+        start = time.perf_counter()
+        try:
+            file = (
+                sys.stdin if path == "-"
+                else open(path, encoding="utf-8")
+            )
+        except FileNotFoundError:
+            raise CommandError(f"Файл не найден: {path}")
+        try:
+            lines = (
+                (number, line) for number, line in enumerate(file, 1)
+                if line.strip()
+            )
+            for chunk in iter_batches(lines, options["transaction_size"]):
+                self.import_chunk(chunk)
+                self.stdout.write(
+                    f"Импортировано рецептов: {self.stats['imported']} "
+                    f"({self.throughput(start):.0f} рецептов/с)"
+                )
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        if self.stats["ingredients"]:
+            ingredient_index.invalidate()
+        if self.stats["imported"]:
+            invalidate_recipe_responses([])
+            recipe_ingredient_index.mark_changed()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Импортировано {self.stats['imported']} рецептов "
+                f"за {time.perf_counter() - start:.2f} с "
+                f"({self.throughput(start):.0f} рецептов/с), "
+                f"новых ингредиентов {self.stats['ingredients']}, "
+                f"пропущено {self.stats['skipped']}."
+            )
+        )
+
+    def throughput(self, start):
+        elapsed = time.perf_counter() - start
+        return self.stats["imported"] / elapsed if elapsed else 0
+
+    def parse_chunk(self, chunk):
+        recipes = []
+        for number, line in chunk:
+            try:
+                recipes.append(parse_recipe(number, line))
+            except (KeyError, TypeError, ValueError) as error:
+                self.skip(number, error)
+        return recipes
+
+    def skip(self, number, reason):
+        self.stats["skipped"] += 1
+        self.stdout.write(
+            self.style.WARNING(f"Строка {number} пропущена: {reason}")
+        )
+
+    def resolve_authors(self, recipes):
+        missing = {
+            recipe["author"] for recipe in recipes
+        } - self.author_ids.keys()
+        self.author_ids.update(
+            User.objects.filter(email__in=missing).values_list("email", "pk")
+        )
+
+    def resolve_ingredients(self, recipes):
+        missing = {}
+        for recipe in recipes:
+            for name, (unit, _) in recipe["ingredients"].items():
+                if name not in self.ingredient_ids:
+                    missing[name] = unit
+        if not missing:
+            return
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in missing.items()
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.ingredient_ids.update(
+            Ingredient.objects.filter(name__in=missing).values_list(
+                "name", "pk"
+            )
+        )
+        self.stats["ingredients"] += len(missing)
+
+    def create_recipes(self, recipes):
+        objs = [
+            Recipe(
+                author_id=self.author_ids[recipe["author"]],
+                name=recipe["name"],
+                text=recipe["text"],
+                cooking_time=recipe["cooking_time"],
+                image=recipe["image"],
+            )
+            for recipe in recipes
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            return Recipe.objects.bulk_create(
+                objs, batch_size=self.batch_size
+            )
+        last_pk = Recipe.objects.aggregate(
+            last_pk=models.Max("pk")
+        )["last_pk"] or 0
+        Recipe.objects.bulk_create(objs, batch_size=self.batch_size)
+        for obj, pk in zip(objs, Recipe.objects.filter(
+            pk__gt=last_pk
+        ).order_by("pk").values_list("pk", flat=True)):
+            obj.pk = pk
+        return objs
+
+    def import_chunk(self, chunk):
+        recipes = self.parse_chunk(chunk)
+        with transaction.atomic():
+            self.resolve_authors(recipes)
+            known = []
+            for recipe in recipes:
+                if recipe["author"] in self.author_ids:
+                    known.append(recipe)
+                else:
+                    self.skip(
+                        recipe["line"],
+                        f"автор {recipe['author']} не найден"
+                    )
+            self.resolve_ingredients(known)
+            objs = self.create_recipes(known)
+            RecipeIngredient.objects.bulk_create(
+                [
+                    RecipeIngredient(
+                        recipe_id=obj.pk,
+                        ingredient_id=self.ingredient_ids[name],
+                        amount=amount,
+                    )
+                    for obj, recipe in zip(objs, known)
+                    for name, (_, amount) in recipe["ingredients"].items()
+                ],
+                batch_size=self.batch_size,
+            )
+            increment_counters(User, "recipes_count", Counter(
+                obj.author_id for obj in objs
+            ))
+            increment_counters(Ingredient, "recipes_count", Counter(
+                self.ingredient_ids[name]
+                for recipe in known for name in recipe["ingredients"]
+            ))
+            fan_out_recipes(objs)
+        self.stats["imported"] += len(objs)
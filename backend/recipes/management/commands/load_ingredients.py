@@ -1,53 +1,223 @@
+import csv
 import json
+import os
+import re
+
 from django.core.management.base import BaseCommand, CommandError
-from recipes.models import Ingredient
+from django.db import transaction
+from django.utils import timezone
+
+from api.autocomplete import ingredient_index
+from api.recipe_cache import invalidate_recipe_responses
+from api.shopping_cart import invalidate_all_shopping_carts
+from recipes.models import INGREDIENT_NAME_MAX_LENGTH, Ingredient, Recipe
+
+READ_CHUNK_SIZE = 64 * 1024
+FORMATS = ("json", "csv")
+CSV_HEADER = ["name", "measurement_unit"]
+JSON_SEPARATORS = re.compile(r"[\s,]*")
+MEASUREMENT_UNIT_MAX_LENGTH = Ingredient._meta.get_field(
+    "measurement_unit"
+).max_length
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Ожидается JSON-массив")
+    position = 1
+    eof = False
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+            parsed = eof or end < len(buffer)
+        except json.JSONDecodeError:
+            parsed = False
+        if not parsed:
+            if eof:
+                raise ValueError("Некорректный формат JSON-файла")
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+def iter_json_ingredients(file):
+    for item in iter_json_array(file):
+        if isinstance(item, dict):
+            yield item.get("name"), item.get("measurement_unit"), item
+        else:
+            yield None, None, item
+
+
+def iter_csv_ingredients(file):
+    for row in csv.reader(file):
+        if row == CSV_HEADER or not row:
+            continue
+        if len(row) != 2:
+            yield None, None, row
+            continue
+        yield row[0], row[1], row
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
 class Command(BaseCommand):
-    help = "Загружает ингредиенты из JSON-файла в базу данных"
+    help = "Загружает ингредиенты из JSON- или CSV-файла в базу данных"
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "json_file",
+            "path",
             type=str,
-            help="Путь к JSON-файлу с ингредиентами"
+            help="Путь к JSON- или CSV-файлу с ингредиентами"
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Формат файла, по умолчанию определяется по расширению"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Число строк, записываемых в базу за один запрос"
+        )
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Обновлять единицы измерения существующих ингредиентов"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только подсчитать изменения, не записывая их в базу"
         )
 
     def handle(self, *args, **options):
-        file_path = options["json_file"]
+        path = options["path"]
+        file_format = options["format"] or (
+            os.path.splitext(path)[1].lstrip(".").lower()
+        )
+        if file_format not in FORMATS:
+            raise CommandError(
+                f"Неизвестный формат файла: {path}. "
+                f"Укажите --format ({', '.join(FORMATS)})"
+            )
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пачки должен быть положительным")
+        self.update = options["update"]
+        self.dry_run = options["dry_run"]
+        self.stats = dict(processed=0, created=0, updated=0, skipped=0)
 
         try:
-            with open(file_path, encoding="utf-8") as file:
-                data = json.load(file)
+            with open(path, encoding="utf-8", newline="") as file:
+                items = (
+                    iter_json_ingredients(file) if file_format == "json"
+                    else iter_csv_ingredients(file)
+                )
+                for batch in iter_batches(items, options["batch_size"]):
+                    self.load_batch(batch)
+                    self.report_progress()
         except FileNotFoundError:
-            raise CommandError(f"Файл не найден: {file_path}")
-        except json.JSONDecodeError:
-            raise CommandError("Некорректный формат JSON-файла")
+            raise CommandError(f"Файл не найден: {path}")
+        except (ValueError, csv.Error) as error:
+            raise CommandError(f"Некорректный формат файла: {error}")
 
-        ingredients_to_create = []
-        for item in data:
-            name = item.get("name")
-            unit = item.get("measurement_unit")
+        if not self.dry_run and (
+            self.stats["created"] or self.stats["updated"]
+        ):
+            ingredient_index.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(
+                ("Будет добавлено" if self.dry_run else "Добавлено")
+                + f" {self.stats['created']} новых ингредиентов, "
+                f"обновлено {self.stats['updated']}, "
+                f"пропущено {self.stats['skipped']}."
+            )
+        )
 
-            if not name or not unit:
+    def clean_batch(self, batch):
+        ingredients = {}
+        for name, unit, item in batch:
+            name = name.strip() if isinstance(name, str) else None
+            unit = unit.strip() if isinstance(unit, str) else None
+            if (
+                not name or not unit
+                or len(name) > INGREDIENT_NAME_MAX_LENGTH
+                or len(unit) > MEASUREMENT_UNIT_MAX_LENGTH
+            ):
+                self.stats["skipped"] += 1
                 self.stdout.write(
                     self.style.WARNING(
                         f"Пропущен некорректный элемент: {item}"
                     )
                 )
                 continue
+            ingredients[name] = unit
+        return ingredients
 
-            if not Ingredient.objects.filter(
-                name=name, measurement_unit=unit
-            ).exists():
-                ingredients_to_create.append(
-                    Ingredient(name=name, measurement_unit=unit)
+    def load_batch(self, batch):
+        self.stats["processed"] += len(batch)
+        ingredients = self.clean_batch(batch)
+        existing = {
+            name: (pk, unit) for pk, name, unit in
+            Ingredient.objects.filter(name__in=ingredients).values_list(
+                "pk", "name", "measurement_unit"
+            )
+        }
+        to_create = [
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in ingredients.items() if name not in existing
+        ]
+        to_update = [
+            Ingredient(pk=existing[name][0], measurement_unit=unit)
+            for name, unit in ingredients.items()
+            if name in existing and existing[name][1] != unit
+        ] if self.update else []
+        self.stats["created"] += len(to_create)
+        self.stats["updated"] += len(to_update)
+        if self.dry_run:
+            return
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(to_create, ignore_conflicts=True)
+            if to_update:
+                Ingredient.objects.bulk_update(
+                    to_update, ["measurement_unit"]
                 )
+                self.refresh_recipes([obj.pk for obj in to_update])
 
-        created = Ingredient.objects.bulk_create(ingredients_to_create)
+    def refresh_recipes(self, ingredient_ids):
+        recipes = Recipe.objects.filter(
+            recipe_ingredients__ingredient__in=ingredient_ids
+        )
+        recipe_ids = list(recipes.values_list("pk", flat=True).distinct())
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+        transaction.on_commit(
+            lambda: invalidate_recipe_responses(recipe_ids)
+        )
+        transaction.on_commit(invalidate_all_shopping_carts)
 
+    def report_progress(self):
         self.stdout.write(
-            self.style.SUCCESS(
-                f"Добавлено {len(created)} новых ингредиентов."
-            )
+            f"Обработано строк: {self.stats['processed']} "
+            f"(новых {self.stats['created']}, "
+            f"обновлённых {self.stats['updated']})"
         )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.exports import process_pending_exports
+
+
+class Command(BaseCommand):
+    help = "Формирует файлы списков покупок из очереди выгрузок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать текущую очередь и завершиться"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Пауза между опросами очереди в секундах"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_exports()
+            if processed:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Сформировано выгрузок: {processed}")
+                )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
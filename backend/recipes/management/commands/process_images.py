@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.images import backfill_image_variants, process_pending_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Формирует миниатюры и WebP-варианты картинок рецептов и аватаров "
+        "из очереди обработки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать текущую очередь и завершиться"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Пауза между опросами очереди в секундах"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Число параллельных обработчиков"
+        )
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Поставить в очередь картинки, загруженные без обработки"
+        )
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            queued = backfill_image_variants()
+            self.stdout.write(
+                self.style.SUCCESS(f"Поставлено в очередь картинок: {queued}")
+            )
+        while True:
+            processed = process_pending_images(workers=options["workers"])
+            if processed:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Обработано картинок: {processed}")
+                )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.similarity import process_pending_similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает похожие рецепты для изменённых и удалённых рецептов "
+        "из очереди"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать текущую очередь и завершиться"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Пауза между опросами очереди в секундах"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_similarity()
+            if processed:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Обработано пересчётов: {processed}")
+                )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.shopping_cart import (
+    find_shopping_cart_total_mismatches,
+    invalidate_all_shopping_carts,
+    rebuild_shopping_cart_totals,
+)
+
+MAX_REPORTED_MISMATCHES = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает агрегированные списки покупок из корзин "
+        "и сверяет их с актуальными данными"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Только сверить агрегаты, не изменяя данные"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Размер пачки при записи агрегатов"
+        )
+
+    def handle(self, *args, **options):
+        if not options["verify"]:
+            created = rebuild_shopping_cart_totals(options["batch_size"])
+            invalidate_all_shopping_carts()
+            self.stdout.write(
+                self.style.SUCCESS(f"Записано {created} строк агрегатов.")
+            )
+        mismatches = find_shopping_cart_total_mismatches()
+        if not mismatches:
+            self.stdout.write(
+                self.style.SUCCESS("Агрегаты совпадают с корзинами.")
+            )
+            return
+        for user_id, ingredient_id, expected, actual in (
+            mismatches[:MAX_REPORTED_MISMATCHES]
+        ):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Пользователь {user_id}, ингредиент {ingredient_id}: "
+                    f"ожидалось {expected}, в агрегате {actual}"
+                )
+            )
+        raise CommandError(
+            f"Найдено расхождений: {len(mismatches)}"
+        )
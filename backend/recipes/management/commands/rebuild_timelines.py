@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.feed import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает ленты подписок из подписок на авторов "
+        "с небольшим числом подписчиков"
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = rebuild_timelines()
+        self.stdout.write(
+            self.style.SUCCESS(f"Записано {created} записей лент подписок.")
+        )
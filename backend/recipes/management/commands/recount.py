@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.recipe_cache import invalidate_favorites_ordering
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0
+    )
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite.objects.all(), 'recipe'),
+    (User, 'recipes_count', Recipe.objects.all(), 'author'),
+    (User, 'followers_count', Subscription.objects.all(), 'author'),
+    (
+        Ingredient, 'recipes_count',
+        RecipeIngredient.objects.all(), 'ingredient'
+    ),
+)
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики и исправляет расхождения"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, counter, queryset, field in COUNTERS:
+                drifted = (
+                    model.objects
+                    .annotate(actual=count_subquery(queryset, field))
+                    .exclude(**{counter: F('actual')})
+                    .values('pk')
+                )
+                fixed = model.objects.filter(pk__in=drifted).update(
+                    **{counter: count_subquery(queryset, field)}
+                )
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{model._meta.verbose_name_plural}.{counter}: "
+                        f"исправлено {fixed}"
+                    )
+                )
+        invalidate_favorites_ordering()
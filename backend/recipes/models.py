@@ -3,6 +3,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
 MIN_COOKING_TIME = 1
+MAX_COOKING_TIME = 32000
 MIN_INGREDIENT_AMOUNT = 1
 MAX_INGREDIENT_AMOUNT = 32000
 INGREDIENT_NAME_MAX_LENGTH = 128
@@ -20,6 +21,12 @@ class Ingredient(models.Model):
         verbose_name="Единица измерения"
     )
 
+    recipes_count = models.PositiveIntegerField(
+        "Число рецептов",
+        default=0,
+        editable=False
+    )
+
     class Meta:
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
@@ -47,6 +54,16 @@ class Recipe(models.Model):
         verbose_name="Картинка"
     )
 
+    image_variants = models.ForeignKey(
+        'ImageVariants',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='recipes',
+        verbose_name="Варианты картинки"
+    )
+
     text = models.TextField(
         verbose_name="Текстовое описание"
     )
@@ -71,14 +88,49 @@ class Recipe(models.Model):
         auto_now_add=True
     )
 
+    favorites_count = models.PositiveIntegerField(
+        "В избранном у пользователей",
+        default=0,
+        editable=False
+    )
+
+    updated_at = models.DateTimeField(
+        "Дата изменения",
+        auto_now=True
+    )
+
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-publication_date",)
+        indexes = [
+            models.Index(
+                fields=['publication_date', 'id'],
+                name='recipe_publication_date_idx'
+            ),
+            models.Index(
+                fields=['favorites_count', 'id'],
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', 'id'],
+                name='recipe_cooking_time_idx'
+            ),
+            models.Index(
+                fields=['author', '-publication_date', '-id'],
+                name='recipe_author_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
@@ -129,6 +181,9 @@ class ShoppingCart(models.Model):
         related_name='user_shopping_cart',
         verbose_name="Выбранный рецепт",
     )
+    created_at = models.DateTimeField(
+        "Дата добавления", auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = "Корзина"
@@ -160,6 +215,9 @@ class Favorite(models.Model):
         related_name='favorite_recipes',
         verbose_name="Избранный рецепт",
     )
+    created_at = models.DateTimeField(
+        "Дата добавления", auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = "Избранное"
@@ -176,3 +234,287 @@ class Favorite(models.Model):
             f"Пользователь {self.user} добавил рецепт "
             f"'{self.recipe.title}' в избранное"
         )
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_totals',
+        verbose_name="Ингредиент",
+    )
+    total_amount = models.IntegerField("Общее количество")
+
+    class Meta:
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списках покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient_shopping_cart',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.user}: {self.ingredient.name} - {self.total_amount}"
+            f"{self.ingredient.measurement_unit}"
+        )
+
+
+class ShoppingCartExport(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        PROCESSING = 'processing', 'Формируется'
+        DONE = 'done', 'Готов'
+        FAILED = 'failed', 'Ошибка'
+
+    class Format(models.TextChoices):
+        PDF = 'pdf', 'PDF'
+        TXT = 'txt', 'Текст'
+        CSV = 'csv', 'CSV'
+        JSON = 'json', 'JSON'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_exports',
+        verbose_name="Пользователь",
+    )
+    format = models.CharField(
+        "Формат",
+        max_length=8,
+        choices=Format.choices,
+        default=Format.PDF,
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    cache_key = models.CharField(
+        "Версия корзины",
+        max_length=255,
+        db_index=True,
+    )
+    file = models.FileField(
+        "Файл",
+        upload_to='shopping_cart_exports/',
+        blank=True,
+    )
+    error = models.TextField("Ошибка", blank=True)
+    created_at = models.DateTimeField("Создан", auto_now_add=True)
+    started_at = models.DateTimeField("Взят в работу", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершён", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Выгрузка списка покупок"
+        verbose_name_plural = "Выгрузки списков покупок"
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f"Выгрузка {self.format} для {self.user} ({self.status})"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Автор рецепта",
+    )
+    publication_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты подписок"
+        verbose_name_plural = "Записи ленты подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_recipe_timeline',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-publication_date', '-recipe'],
+                name='timeline_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.recipe}"
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField("Сходство по ингредиентам")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_recipe_similar',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} ~ {self.similar} ({self.score:.2f})"
+
+
+class SimilarityRefresh(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        PROCESSING = 'processing', 'Пересчитывается'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    class Kind(models.TextChoices):
+        REFRESH = 'refresh', 'Пересчёт рецепта'
+        REFILL = 'refill', 'Дополнение списка'
+
+    recipe_id = models.PositiveIntegerField("Рецепт", db_index=True)
+    kind = models.CharField(
+        "Тип",
+        max_length=8,
+        choices=Kind.choices,
+        default=Kind.REFRESH,
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    error = models.TextField("Ошибка", blank=True)
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    started_at = models.DateTimeField(
+        "Взято в работу", null=True, blank=True
+    )
+    finished_at = models.DateTimeField("Обработано", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Пересчёт похожих рецептов"
+        verbose_name_plural = "Пересчёты похожих рецептов"
+        ordering = ('created_at',)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.recipe_id} ({self.status})"
+
+
+class TrendingScore(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending_score',
+        verbose_name="Рецепт",
+    )
+    score = models.FloatField("Популярность")
+    computed_at = models.DateTimeField("Дата расчёта")
+
+    class Meta:
+        verbose_name = "Популярность рецепта"
+        verbose_name_plural = "Популярность рецептов"
+        indexes = [
+            models.Index(
+                fields=['-score', '-recipe'],
+                name='trending_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe}: {self.score:.2f}"
+
+
+class ImageVariants(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        PROCESSING = 'processing', 'Обрабатывается'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    source = models.CharField(
+        "Исходное изображение",
+        max_length=255,
+        unique=True,
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    thumbnail = models.ImageField(
+        "Миниатюра",
+        upload_to='image_variants/',
+        blank=True,
+    )
+    thumbnail_webp = models.ImageField(
+        "Миниатюра WebP",
+        upload_to='image_variants/',
+        blank=True,
+    )
+    webp = models.ImageField(
+        "Изображение WebP",
+        upload_to='image_variants/',
+        blank=True,
+    )
+    error = models.TextField("Ошибка", blank=True)
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    started_at = models.DateTimeField(
+        "Взято в работу", null=True, blank=True
+    )
+    finished_at = models.DateTimeField("Обработано", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Варианты изображения"
+        verbose_name_plural = "Варианты изображений"
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
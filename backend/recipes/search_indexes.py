@@ -0,0 +1,84 @@
+from django.db import connections
+
+from .models import Ingredient, Recipe
+
+SEARCH_INDEXED_MODELS = (Ingredient, Recipe)
+RECIPE_TABLE = Recipe._meta.db_table
+RECIPE_FTS_TABLE = f'{RECIPE_TABLE}_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_CONFIG = 'russian'
+
+
+def get_search_index_statements(model):
+    table = model._meta.db_table
+    return (
+        f'CREATE INDEX IF NOT EXISTS {table}_name_upper_prefix '
+        f'ON {table} (UPPER(name::text) text_pattern_ops)',
+        f'CREATE INDEX IF NOT EXISTS {table}_name_upper_trgm '
+        f'ON {table} USING gin (UPPER(name::text) gin_trgm_ops)',
+        f'CREATE INDEX IF NOT EXISTS {table}_name_trgm '
+        f'ON {table} USING gin (name gin_trgm_ops)',
+    )
+
+
+def get_full_text_statements(vendor):
+    if vendor == 'postgresql':
+        return (
+            f'ALTER TABLE {RECIPE_TABLE} '
+            f'ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector '
+            f'GENERATED ALWAYS AS ('
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+            f"coalesce(name, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+            f"coalesce(text, '')), 'B')) STORED",
+            f'CREATE INDEX IF NOT EXISTS {RECIPE_TABLE}_search_vector '
+            f'ON {RECIPE_TABLE} USING gin ({SEARCH_VECTOR_COLUMN})',
+        )
+    if vendor == 'sqlite':
+        return (
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {RECIPE_FTS_TABLE} '
+            f"USING fts5(name, text, content='{RECIPE_TABLE}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f'CREATE TRIGGER IF NOT EXISTS {RECIPE_FTS_TABLE}_insert '
+            f'AFTER INSERT ON {RECIPE_TABLE} BEGIN '
+            f'INSERT INTO {RECIPE_FTS_TABLE}(rowid, name, text) '
+            f'VALUES (new.id, new.name, new.text); END',
+            f'CREATE TRIGGER IF NOT EXISTS {RECIPE_FTS_TABLE}_delete '
+            f'AFTER DELETE ON {RECIPE_TABLE} BEGIN '
+            f'INSERT INTO {RECIPE_FTS_TABLE}'
+            f'({RECIPE_FTS_TABLE}, rowid, name, text) '
+            f"VALUES ('delete', old.id, old.name, old.text); END",
+            f'CREATE TRIGGER IF NOT EXISTS {RECIPE_FTS_TABLE}_update '
+            f'AFTER UPDATE OF name, text ON {RECIPE_TABLE} BEGIN '
+            f'INSERT INTO {RECIPE_FTS_TABLE}'
+            f'({RECIPE_FTS_TABLE}, rowid, name, text) '
+            f"VALUES ('delete', old.id, old.name, old.text); "
+            f'INSERT INTO {RECIPE_FTS_TABLE}(rowid, name, text) '
+            f'VALUES (new.id, new.name, new.text); END',
+            f'INSERT INTO {RECIPE_FTS_TABLE}({RECIPE_FTS_TABLE}) '
+            f"VALUES ('rebuild')",
+        )
+    return ()
+
+
+def create_full_text_index(connection):
+    if (
+        connection.vendor == 'sqlite'
+        and RECIPE_FTS_TABLE in connection.introspection.table_names()
+    ):
+        return
+    with connection.cursor() as cursor:
+        for statement in get_full_text_statements(connection.vendor):
+            cursor.execute(statement)
+
+
+def create_search_indexes(using, **kwargs):
+    connection = connections[using]
+    create_full_text_index(connection)
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for model in SEARCH_INDEXED_MODELS:
+            for statement in get_search_index_statements(model):
+                cursor.execute(statement)
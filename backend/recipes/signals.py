@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Favorite, Ingredient, Recipe, RecipeIngredient
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(instance, **kwargs):
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(
+        favorites_count=F('favorites_count') - 1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_author_recipes_count(instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_author_recipes_count(instance, **kwargs):
+    User.objects.filter(
+        pk=instance.author_id, recipes_count__gt=0
+    ).update(
+        recipes_count=F('recipes_count') - 1
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def increment_ingredient_recipes_count(instance, created, **kwargs):
+    if created:
+        Ingredient.objects.filter(pk=instance.ingredient_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def decrement_ingredient_recipes_count(instance, **kwargs):
+    Ingredient.objects.filter(
+        pk=instance.ingredient_id, recipes_count__gt=0
+    ).update(
+        recipes_count=F('recipes_count') - 1
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(
+            recipe_ingredients__ingredient=instance
+        ).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Ingredient)
+def touch_deleted_ingredient_recipes(instance, **kwargs):
+    Recipe.objects.filter(
+        recipe_ingredients__ingredient=instance
+    ).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def touch_recipe_ingredient_recipe(instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated_at=timezone.now()
+    )
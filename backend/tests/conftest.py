@@ -0,0 +1,193 @@
+import base64
+import io
+import os
+import statistics
+import time
+from collections import defaultdict
+
+import django
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+os.environ.setdefault('USE_SQLITE', 'True')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.files.base import ContentFile  # noqa: E402
+from django.core.files.storage import default_storage  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.test import APIClient  # noqa: E402
+
+from recipes.models import (  # noqa: E402
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart)
+from users.models import Subscription, User  # noqa: E402
+
+SEED_USERS = int(os.getenv('BENCHMARK_USERS', 20))
+SEED_RECIPES_PER_USER = int(os.getenv('BENCHMARK_RECIPES_PER_USER', 5))
+SEED_INGREDIENTS = int(os.getenv('BENCHMARK_INGREDIENTS', 200))
+INGREDIENTS_PER_RECIPE = 8
+BENCHMARK_ROUNDS = int(os.getenv('BENCHMARK_ROUNDS', 5))
+
+PIXEL_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwAD'
+    'hgGAWjR9awAAAABJRU5ErkJggg=='
+)
+PIXEL_PNG_DATA_URI = (
+    'data:image/png;base64,' + base64.b64encode(PIXEL_PNG).decode()
+)
+
+_reports = defaultdict(list)
+
+
+def report(section, **row):
+    _reports[section].append(row)
+
+
+@pytest.fixture(scope='session')
+def django_db(tmp_path_factory):
+    settings.MEDIA_ROOT = str(tmp_path_factory.mktemp('media'))
+    settings.MIGRATION_MODULES = {'users': None, 'recipes': None}
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True
+    )
+    yield
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+
+
+@pytest.fixture(scope='session')
+def seed(django_db):
+    image = default_storage.save('recipes/seed.png', ContentFile(PIXEL_PNG))
+    User.objects.bulk_create([
+        User(
+            username=f'user{i}',
+            email=f'user{i}@foodgram.ru',
+            first_name='Имя',
+            last_name='Фамилия',
+        ) for i in range(SEED_USERS)
+    ])
+    users = list(User.objects.order_by('id'))
+    Ingredient.objects.bulk_create([
+        Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+        for i in range(SEED_INGREDIENTS)
+    ])
+    ingredients = list(Ingredient.objects.order_by('id'))
+    Recipe.objects.bulk_create([
+        Recipe(
+            author=author,
+            name=f'Рецепт {author.username} №{i}',
+            image=image,
+            text='Описание рецепта',
+            cooking_time=i + 1,
+        )
+        for author in users for i in range(SEED_RECIPES_PER_USER)
+    ])
+    recipes = list(Recipe.objects.order_by('id'))
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[(index + j) % len(ingredients)],
+            amount=j + 1,
+        )
+        for index, recipe in enumerate(recipes)
+        for j in range(INGREDIENTS_PER_RECIPE)
+    ])
+    reader = users[0]
+    Favorite.objects.bulk_create([
+        Favorite(user=user, recipe=recipe)
+        for user in users for recipe in recipes[::2]
+    ])
+    ShoppingCart.objects.bulk_create([
+        ShoppingCart(user=user, recipe=recipe)
+        for user in users for recipe in recipes[::3]
+    ])
+    Subscription.objects.bulk_create([
+        Subscription(subscriber=reader, author=author)
+        for author in users[1:]
+    ])
+    call_command('rebuild_shopping_cart_totals', stdout=io.StringIO())
+    call_command('recount', stdout=io.StringIO())
+    call_command('rebuild_timelines', stdout=io.StringIO())
+    call_command('build_similar_recipes', stdout=io.StringIO())
+    return {'reader': reader, 'recipe': recipes[0]}
+
+
+@pytest.fixture
+def anon_client(seed):
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(seed):
+    client = APIClient()
+    client.force_authenticate(seed['reader'])
+    return client
+
+
+@pytest.fixture
+def settings_override():
+    overrides = []
+
+    def _override(**kwargs):
+        override = override_settings(**kwargs)
+        override.enable()
+        overrides.append(override)
+
+    yield _override
+    for override in reversed(overrides):
+        override.disable()
+
+
+@pytest.fixture
+def measure():
+    def _measure(client, url, max_queries):
+        client.get(url)
+        timings = []
+        query_counts = []
+        for _ in range(BENCHMARK_ROUNDS):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append(time.perf_counter() - start)
+            query_counts.append(len(context.captured_queries))
+        report(
+            'query budget / latency',
+            endpoint=url,
+            queries=max(query_counts),
+            budget=max_queries,
+            median_ms=f'{statistics.median(timings) * 1000:.2f}',
+        )
+        assert response.status_code == 200, response.content[:200]
+        assert max(query_counts) <= max_queries, (
+            f'{url}: {max(query_counts)} запросов к БД, '
+            f'допустимо не больше {max_queries}'
+        )
+        return response
+    return _measure
+
+
+def pytest_terminal_summary(terminalreporter):
+    for section, rows in _reports.items():
+        terminalreporter.section(section)
+        widths = {
+            column: max(len(column), *(len(str(row[column])) for row in rows))
+            for column in rows[0]
+        }
+        terminalreporter.write_line(' '.join(
+            column.ljust(width) for column, width in widths.items()
+        ).rstrip())
+        for row in rows:
+            terminalreporter.write_line(' '.join(
+                str(row[column]).ljust(width)
+                for column, width in widths.items()
+            ).rstrip())
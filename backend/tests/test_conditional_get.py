@@ -0,0 +1,123 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from api.caching import ConditionalGetMixin, VersionedConditionalGetMixin
+from api.serializers import IngredientSerializer
+from recipes.models import Favorite, Ingredient, Recipe
+from users.models import Subscription, User
+
+RECIPES_URL = '/api/recipes/'
+USERS_URL = '/api/users/'
+
+
+def revalidate(client, url, max_queries):
+    etag = client.get(url)['ETag']
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert not response.content
+    assert len(context.captured_queries) <= max_queries
+    return etag
+
+
+@pytest.mark.parametrize('url, max_queries', [
+    (RECIPES_URL, 0),
+    (f'{RECIPES_URL}?is_favorited=1', 0),
+    ('/api/ingredients/', 0),
+    ('/api/ingredients/?search=ингредиент', 0),
+    (USERS_URL, 1),
+    (f'{USERS_URL}me/', 0),
+])
+def test_unchanged_resources_return_not_modified(user_client, url,
+                                                 max_queries):
+    revalidate(user_client, url, max_queries)
+
+
+def test_detail_endpoints_return_not_modified(user_client, seed):
+    revalidate(user_client, f'{RECIPES_URL}{seed["recipe"].id}/', 0)
+    revalidate(user_client, f'{USERS_URL}{seed["reader"].id}/', 1)
+
+
+def test_etag_depends_on_user(user_client, anon_client):
+    assert user_client.get(RECIPES_URL)['ETag'] != (
+        anon_client.get(RECIPES_URL)['ETag']
+    )
+
+
+def test_personal_state_changes_etag(user_client, seed):
+    recipe = Recipe.objects.order_by('id')[1]
+    etag = revalidate(user_client, RECIPES_URL, 0)
+    favorite = Favorite.objects.create(user=seed['reader'], recipe=recipe)
+    assert user_client.get(
+        RECIPES_URL, HTTP_IF_NONE_MATCH=etag
+    ).status_code == 200
+    favorite.delete()
+
+
+def test_subscription_changes_user_etag(seed):
+    follower = User.objects.order_by('id')[3]
+    client = APIClient()
+    client.force_authenticate(follower)
+    url = f'{USERS_URL}{seed["reader"].id}/'
+    etag = revalidate(client, url, 1)
+    subscription = Subscription.objects.create(
+        subscriber=follower, author=seed['reader']
+    )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['is_subscribed']
+    subscription.delete()
+
+
+def test_profile_change_updates_user_etags(user_client):
+    user = User.objects.order_by('id')[4]
+    url = f'{USERS_URL}{user.id}/'
+    detail_etag = revalidate(user_client, url, 1)
+    list_etag = revalidate(user_client, USERS_URL, 1)
+    user.first_name = 'Обновлённый'
+    user.save()
+    assert user_client.get(
+        url, HTTP_IF_NONE_MATCH=detail_etag
+    ).status_code == 200
+    assert user_client.get(
+        USERS_URL, HTTP_IF_NONE_MATCH=list_etag
+    ).status_code == 200
+
+
+def test_ingredient_change_updates_etag(anon_client):
+    etag = revalidate(anon_client, '/api/ingredients/', 0)
+    ingredient = Ingredient.objects.order_by('id').first()
+    ingredient.save()
+    assert anon_client.get(
+        '/api/ingredients/', HTTP_IF_NONE_MATCH=etag
+    ).status_code == 200
+
+
+def test_missing_resources_have_no_etag(user_client):
+    assert not user_client.get(f'{USERS_URL}999999/').has_header('ETag')
+    assert not user_client.get(f'{RECIPES_URL}999999/').has_header('ETag')
+
+
+class PlainIngredientViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
+    queryset = Ingredient.objects.all()
+    serializer_class = IngredientSerializer
+    pagination_class = None
+
+
+class UnversionedIngredientViewSet(VersionedConditionalGetMixin,
+                                   PlainIngredientViewSet):
+    pass
+
+
+@pytest.mark.parametrize('viewset', [
+    PlainIngredientViewSet, UnversionedIngredientViewSet
+])
+def test_views_without_validators_are_not_conditional(seed, viewset):
+    view = viewset.as_view({'get': 'list'})
+    response = view(APIRequestFactory().get('/'))
+    assert response.status_code == 200
+    assert not response.has_header('ETag')
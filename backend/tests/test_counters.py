@@ -0,0 +1,79 @@
+import io
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe
+from users.models import User
+from conftest import PIXEL_PNG_DATA_URI
+
+
+def recount():
+    output = io.StringIO()
+    call_command('recount', stdout=output)
+    return output.getvalue()
+
+
+def test_seeded_counters_are_consistent(seed):
+    assert all(
+        line.endswith('исправлено 0') for line in recount().splitlines()
+    )
+
+
+def test_favorite_updates_recipe_counter(user_client):
+    recipe = Recipe.objects.order_by('id')[1]
+    url = f'/api/recipes/{recipe.id}/favorite/'
+    assert user_client.post(url).status_code == 201
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == recipe.favorite_recipes.count()
+    assert user_client.delete(url).status_code == 204
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == recipe.favorite_recipes.count()
+
+
+def test_subscription_updates_followers_counter(seed):
+    client_user = User.objects.get(username='user5')
+    author = seed['reader']
+    client = APIClient()
+    client.force_authenticate(client_user)
+    url = f'/api/users/{author.id}/subscribe/'
+    assert client.post(url).status_code == 201
+    author.refresh_from_db()
+    assert author.followers_count == author.followers.count() == 1
+    assert client.delete(url).status_code == 204
+    author.refresh_from_db()
+    assert author.followers_count == 0
+
+
+def test_recipe_write_updates_author_and_ingredient_counters(
+    user_client, seed
+):
+    author = seed['reader']
+    ingredient = Ingredient.objects.order_by('id').last()
+    recipes_before = author.recipes.count()
+    uses_before = ingredient.recipe_ingredients.count()
+    response = user_client.post('/api/recipes/', {
+        'ingredients': [{'id': ingredient.id, 'amount': 10}],
+        'image': PIXEL_PNG_DATA_URI,
+        'name': 'Счётчики',
+        'text': 'Проверка счётчиков',
+        'cooking_time': 5,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    author.refresh_from_db()
+    ingredient.refresh_from_db()
+    assert author.recipes_count == recipes_before + 1
+    assert ingredient.recipes_count == uses_before + 1
+    Recipe.objects.get(pk=response.json()['id']).delete()
+    author.refresh_from_db()
+    ingredient.refresh_from_db()
+    assert author.recipes_count == recipes_before
+    assert ingredient.recipes_count == uses_before
+
+
+def test_recount_repairs_drift(seed):
+    Recipe.objects.filter(pk=seed['recipe'].pk).update(favorites_count=999)
+    assert 'исправлено 1' in recount()
+    assert Recipe.objects.get(pk=seed['recipe'].pk).favorites_count == (
+        seed['recipe'].favorite_recipes.count()
+    )
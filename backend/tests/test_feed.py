@@ -0,0 +1,151 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Subscription
+from conftest import BENCHMARK_ROUNDS, report
+
+User = get_user_model()
+
+FEED_URL = '/api/recipes/feed/'
+FEED_MAX_QUERIES = 4
+
+
+def make_user(name):
+    return User.objects.create(
+        username=name, email=f'{name}@foodgram.ru',
+        first_name='Имя', last_name='Фамилия',
+    )
+
+
+def make_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def read_feed(client, limit=7):
+    ids = []
+    url = f'{FEED_URL}?limit={limit}'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        ids.extend(recipe['id'] for recipe in response.data['results'])
+        url = response.data['next']
+    return ids
+
+
+def expected_feed(user):
+    return list(
+        Recipe.objects.filter(
+            author__in=user.subscriptions.values('author_id')
+        ).order_by('-publication_date', '-id').values_list('id', flat=True)
+    )
+
+
+def create_recipe(author, name):
+    return Recipe.objects.create(
+        author=author, name=name, text='Описание рецепта',
+        image='recipes/seed.png', cooking_time=5,
+    )
+
+
+def test_feed_requires_authentication(anon_client):
+    assert anon_client.get(FEED_URL).status_code == 401
+
+
+def test_feed_pages_through_followed_recipes(user_client, seed):
+    assert read_feed(user_client) == expected_feed(seed['reader'])
+
+
+def test_feed_pulls_prolific_authors_on_read(user_client, seed,
+                                             settings_override):
+    settings_override(FEED_FANOUT_MAX_FOLLOWERS=0)
+    assert read_feed(user_client) == expected_feed(seed['reader'])
+
+
+def test_feed_follows_subscriptions_and_new_recipes(seed):
+    follower = make_user('feed_follower')
+    author = make_user('feed_author')
+    client = make_client(follower)
+    old = create_recipe(author, 'Старый рецепт')
+    assert read_feed(client) == []
+
+    Subscription.objects.create(subscriber=follower, author=author)
+    assert read_feed(client) == [old.id]
+
+    new = create_recipe(author, 'Новый рецепт')
+    assert TimelineEntry.objects.filter(
+        user=follower, recipe=new
+    ).exists()
+    assert read_feed(client) == [new.id, old.id]
+
+    Subscription.objects.filter(subscriber=follower, author=author).delete()
+    assert read_feed(client) == []
+    assert not TimelineEntry.objects.filter(user=follower).exists()
+    author.delete()
+    follower.delete()
+
+
+def test_feed_follows_fanout_threshold_crossings(seed, settings_override):
+    settings_override(FEED_FANOUT_MAX_FOLLOWERS=1)
+    first = make_user('feed_first')
+    second = make_user('feed_second')
+    author = make_user('feed_popular')
+    recipe = create_recipe(author, 'Рецепт популярного автора')
+    entries = TimelineEntry.objects.filter(author=author)
+
+    Subscription.objects.create(subscriber=first, author=author)
+    assert list(entries.values_list('user_id', flat=True)) == [first.id]
+    Subscription.objects.create(subscriber=second, author=author)
+    assert not entries.exists()
+    for user in (first, second):
+        assert read_feed(make_client(user)) == [recipe.id]
+
+    Subscription.objects.filter(subscriber=second, author=author).delete()
+    assert list(entries.values_list('user_id', flat=True)) == [first.id]
+    assert read_feed(make_client(first)) == [recipe.id]
+    User.objects.filter(pk__in=[first.id, second.id, author.id]).delete()
+
+
+def benchmark_feed(client):
+    client.get(FEED_URL)
+    timings = []
+    query_counts = []
+    for _ in range(BENCHMARK_ROUNDS):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(FEED_URL)
+            timings.append(time.perf_counter() - start)
+        query_counts.append(len(context.captured_queries))
+    assert response.status_code == 200, response.content
+    return response, max(query_counts), statistics.median(timings)
+
+
+def test_feed_cost_does_not_depend_on_follow_count(seed):
+    narrow = make_user('feed_narrow')
+    for author in User.objects.filter(
+        followers__subscriber=seed['reader']
+    ).order_by('id')[:5]:
+        Subscription.objects.create(subscriber=narrow, author=author)
+    query_counts = set()
+    for user in (narrow, seed['reader']):
+        response, queries, median = benchmark_feed(make_client(user))
+        results = [recipe['id'] for recipe in response.data['results']]
+        assert results == expected_feed(user)[:len(results)]
+        query_counts.add(queries)
+        report(
+            'feed',
+            follows=user.subscriptions.count(),
+            recipes=len(results),
+            queries=queries,
+            median_ms=f'{median * 1000:.2f}',
+        )
+    narrow.delete()
+    assert len(query_counts) == 1
+    assert query_counts.pop() <= FEED_MAX_QUERIES
@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+from conftest import PIXEL_PNG_DATA_URI
+
+RECIPES_URL = '/api/recipes/'
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def test_warm_page_skips_ingredient_prefetch(user_client):
+    cache.clear()
+    with CaptureQueriesContext(connection) as cold:
+        user_client.get(RECIPES_URL)
+    with CaptureQueriesContext(connection) as warm:
+        response = user_client.get(RECIPES_URL)
+    assert response.status_code == 200
+    assert len(warm.captured_queries) < len(cold.captured_queries)
+    assert not any(
+        'recipe_ingredient' in query['sql']
+        for query in warm.captured_queries
+    )
+    assert all(item['ingredients'] for item in response.json()['results'])
+
+
+def test_personal_flags_are_merged_per_user(seed):
+    reader = seed['reader']
+    stranger = User.objects.create_user(
+        username='fragment', email='fragment@example.com',
+        first_name='Фрагмент', last_name='Кэшев', password='secret-123',
+    )
+    url = f'{RECIPES_URL}{seed["recipe"].id}/'
+    reader_data = client_for(reader).get(url).json()
+    stranger_data = client_for(stranger).get(url).json()
+    assert reader_data['is_favorited'] and reader_data['is_in_shopping_cart']
+    assert not stranger_data['is_favorited']
+    assert not stranger_data['is_in_shopping_cart']
+    assert reader_data['ingredients'] == stranger_data['ingredients']
+    stranger.delete()
+
+
+def test_recipe_update_refreshes_fragment(seed):
+    recipe = Recipe.objects.filter(author=seed['reader']).order_by('id')[1]
+    client = client_for(seed['reader'])
+    url = f'{RECIPES_URL}{recipe.id}/'
+    client.get(url)
+    ingredient = Ingredient.objects.order_by('id').last()
+    response = client.patch(url, {
+        'ingredients': [{'id': ingredient.id, 'amount': 3}],
+        'image': PIXEL_PNG_DATA_URI,
+        'name': 'Новый фрагмент',
+        'text': 'Обновлённый текст',
+        'cooking_time': 7,
+    }, format='json')
+    assert response.status_code == 200, response.content
+    data = client.get(url).json()
+    assert data['name'] == 'Новый фрагмент'
+    assert [item['id'] for item in data['ingredients']] == [ingredient.id]
+
+
+def test_author_and_ingredient_changes_refresh_fragments(user_client):
+    recipe = Recipe.objects.order_by('id')[7]
+    url = f'{RECIPES_URL}{recipe.id}/'
+    user_client.get(url)
+    author = recipe.author
+    author.last_name = 'Новофамильный'
+    author.save(update_fields=['last_name'])
+    ingredient = recipe.recipe_ingredients.first().ingredient
+    ingredient.name = 'переименованный ингредиент'
+    ingredient.save()
+    data = user_client.get(url).json()
+    assert data['author']['last_name'] == 'Новофамильный'
+    assert 'переименованный ингредиент' in [
+        item['name'] for item in data['ingredients']
+    ]
+
+
+def test_recipe_ingredient_rows_refresh_fragments(user_client):
+    recipe = Recipe.objects.order_by('id')[8]
+    url = f'{RECIPES_URL}{recipe.id}/'
+    ingredient = Ingredient.objects.create(
+        name='временный ингредиент', measurement_unit='г'
+    )
+
+    def ingredient_amounts():
+        return {
+            item['id']: item['amount']
+            for item in user_client.get(url).json()['ingredients']
+        }
+
+    user_client.get(url)
+    row = RecipeIngredient.objects.create(
+        recipe=recipe, ingredient=ingredient, amount=2
+    )
+    assert ingredient_amounts()[ingredient.id] == 2
+    row.amount = 5
+    row.save()
+    assert ingredient_amounts()[ingredient.id] == 5
+    ingredient.delete()
+    assert ingredient.id not in ingredient_amounts()
+
+
+def test_fragments_are_kept_per_scheme(user_client, seed):
+    url = f'{RECIPES_URL}{seed["recipe"].id}/'
+    assert user_client.get(url).json()['image'].startswith('http://')
+    assert user_client.get(url, secure=True).json()['image'].startswith(
+        'https://'
+    )
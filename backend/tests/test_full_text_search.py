@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import statistics
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from api.filters import get_full_text_expressions, to_fts_query
+from recipes.models import Recipe
+from recipes.search_indexes import RECIPE_TABLE, get_full_text_statements
+from conftest import BENCHMARK_ROUNDS, report
+
+User = get_user_model()
+
+RECIPES_URL = '/api/recipes/'
+SEARCH_SIZES = [
+    int(size) for size in
+    os.getenv('BENCHMARK_SEARCH_SIZES', '10000,100000').split(',')
+]
+SEARCH_MATCHES = 20
+VOCABULARY = (
+    'тесто', 'мука', 'соль', 'сахар', 'масло', 'яйцо', 'молоко', 'варить',
+    'жарить', 'запекать', 'нарезать', 'смешать', 'подавать', 'горячим',
+)
+
+
+@pytest.fixture
+def author(seed):
+    user = User.objects.create(
+        username='fulltext', email='fulltext@foodgram.ru',
+        first_name='Имя', last_name='Фамилия',
+    )
+    yield user
+    user.delete()
+
+
+def create_recipe(author, name, text):
+    return Recipe.objects.create(
+        author=author, name=name, text=text,
+        image='recipes/seed.png', cooking_time=5,
+    )
+
+
+def search(client, query):
+    response = client.get(RECIPES_URL, {'q': query})
+    assert response.status_code == 200, response.content
+    return response.json()['results']
+
+
+def test_query_is_stemmed_for_fts():
+    assert to_fts_query('Домашние пельменей!') == '"домашн"* "пельмен"*'
+
+
+def test_search_ranks_name_matches_first(anon_client, author):
+    in_text = create_recipe(
+        author, 'Ужин', 'Подавайте с варениками и сметаной'
+    )
+    in_name = create_recipe(
+        author, 'Вареники с вишней', 'Слепите и отварите'
+    )
+    results = search(anon_client, 'вареники')
+    assert [recipe['id'] for recipe in results] == [in_name.id, in_text.id]
+    assert '<b>варениками</b>' in results[1]['search_snippet']
+
+
+def test_search_snippet_escapes_recipe_text(anon_client, author):
+    create_recipe(
+        author, 'Опасный рецепт', '<script>alert(1)</script> кулебяка'
+    )
+    snippet = search(anon_client, 'кулебяка')[0]['search_snippet']
+    assert '<script>' not in snippet
+    assert '&lt;script&gt;' in snippet
+    assert '<b>кулебяка</b>' in snippet
+
+
+def test_search_applies_other_filters_to_every_match(anon_client, author):
+    recipes = [
+        create_recipe(author, f'Расстегай №{i}', 'С рыбой') for i in range(3)
+    ]
+    response = anon_client.get(
+        RECIPES_URL, {'q': 'расстегай', 'author': author.id}
+    )
+    assert response.json()['count'] == len(recipes)
+
+
+def test_search_index_follows_writes(anon_client, author):
+    recipe = create_recipe(author, 'Суп', 'Щавелевый суп на бульоне')
+    assert [r['id'] for r in search(anon_client, 'щавелевый')] == [recipe.id]
+    recipe.text = 'Грибной суп на бульоне'
+    recipe.save()
+    assert search(anon_client, 'щавелевый') == []
+    assert [r['id'] for r in search(anon_client, 'грибной')] == [recipe.id]
+    recipe.delete()
+    assert search(anon_client, 'грибной') == []
+
+
+def fill_search_database(size):
+    database = sqlite3.connect(':memory:')
+    database.execute(
+        f'CREATE TABLE {RECIPE_TABLE} '
+        '(id INTEGER PRIMARY KEY, name TEXT, text TEXT)'
+    )
+    for statement in get_full_text_statements('sqlite'):
+        database.execute(statement)
+    step = size // SEARCH_MATCHES
+    database.executemany(
+        f'INSERT INTO {RECIPE_TABLE} (id, name, text) VALUES (?, ?, ?)',
+        (
+            (
+                pk, f'Рецепт {pk}',
+                ' '.join(
+                    VOCABULARY[(pk * 7 + i) % len(VOCABULARY)]
+                    for i in range(12)
+                ) + (' расстегаи' if pk % step == 0 else '')
+            )
+            for pk in range(1, size + 1)
+        )
+    )
+    return database
+
+
+def time_query(database, sql, params):
+    timings = []
+    for _ in range(BENCHMARK_ROUNDS):
+        start = time.perf_counter()
+        rows = database.execute(sql.replace('%s', '?'), params).fetchall()
+        timings.append(time.perf_counter() - start)
+    return rows, statistics.median(timings) * 1000
+
+
+@pytest.mark.parametrize('size', SEARCH_SIZES)
+def test_full_text_latency_does_not_grow_with_table(size):
+    database = fill_search_database(size)
+    query = to_fts_query('расстегаи')
+    matches, rank, snippet, match_params, params = (
+        get_full_text_expressions('sqlite', query)
+    )
+    found, fts_ms = time_query(
+        database,
+        f'SELECT id, ({rank}) AS search_rank, ({snippet}) '
+        f'FROM {RECIPE_TABLE} WHERE id IN ({matches}) '
+        'ORDER BY search_rank DESC, id DESC LIMIT 6',
+        [*params, *params, *match_params],
+    )
+    scanned, scan_ms = time_query(
+        database,
+        f'SELECT id FROM {RECIPE_TABLE} WHERE text LIKE ? '
+        'ORDER BY id DESC LIMIT 6',
+        ['%расстега%'],
+    )
+    database.close()
+    assert len(found) == 6
+    assert sorted(row[0] for row in found) == sorted(
+        row[0] for row in scanned
+    )
+    report(
+        'full-text search',
+        recipes=size,
+        fts_ms=f'{fts_ms:.3f}',
+        like_scan_ms=f'{scan_ms:.2f}',
+    )
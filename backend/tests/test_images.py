@@ -0,0 +1,139 @@
+import base64
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+
+from api.images import (
+    backfill_image_variants,
+    claim_next_image_variants,
+    process_pending_images,
+)
+from recipes.models import ImageVariants, Ingredient, Recipe
+from conftest import report
+
+
+def make_image(size=(1200, 900), image_format='PNG'):
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def data_uri(content, mime='image/png'):
+    return f'data:{mime};base64,' + base64.b64encode(content).decode()
+
+
+def create_recipe(client, content):
+    ingredient = Ingredient.objects.order_by('id').first()
+    response = client.post('/api/recipes/', {
+        'ingredients': [{'id': ingredient.id, 'amount': 1}],
+        'image': data_uri(content),
+        'name': 'Большая картинка',
+        'text': 'Проверка миниатюр',
+        'cooking_time': 3,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    return Recipe.objects.get(pk=response.json()['id'])
+
+
+def list_item(client, recipe):
+    results = client.get(
+        f'/api/recipes/?author={recipe.author_id}&limit=100'
+    ).json()['results']
+    return next(item for item in results if item['id'] == recipe.id)
+
+
+def test_recipe_image_variants(user_client):
+    content = make_image()
+    recipe = create_recipe(user_client, content)
+    try:
+        variants = recipe.image_variants
+        assert variants.status == ImageVariants.Status.PENDING
+        item = list_item(user_client, recipe)
+        assert item['image'].endswith(recipe.image.name)
+        assert item['image_webp'] is None
+
+        assert process_pending_images() >= 1
+        variants.refresh_from_db()
+        assert variants.status == ImageVariants.Status.DONE
+        with default_storage.open(variants.thumbnail.name) as file:
+            assert max(Image.open(file).size) <= 480
+        with default_storage.open(variants.webp.name) as file:
+            assert Image.open(file).format == 'WEBP'
+
+        item = list_item(user_client, recipe)
+        assert item['image'].endswith(variants.thumbnail.name)
+        assert item['image_webp'].endswith(variants.thumbnail_webp.name)
+        detail = user_client.get(f'/api/recipes/{recipe.id}/').json()
+        assert detail['image'].endswith(recipe.image.name)
+        assert detail['image_webp'].endswith(variants.webp.name)
+        report(
+            'image variants',
+            variant='original png',
+            bytes=recipe.image.size,
+        )
+        for name in ('thumbnail', 'thumbnail_webp', 'webp'):
+            report(
+                'image variants',
+                variant=name,
+                bytes=getattr(variants, name).size,
+            )
+    finally:
+        recipe.delete()
+
+
+def test_avatar_thumbnail(seed, user_client):
+    response = user_client.put('/api/users/me/avatar/', {
+        'avatar': data_uri(make_image((800, 800), 'JPEG'), 'image/jpeg')
+    }, format='json')
+    assert response.status_code == 200, response.content
+    process_pending_images(workers=2)
+    seed['reader'].refresh_from_db()
+    variants = seed['reader'].avatar_variants
+    assert variants.status == ImageVariants.Status.DONE
+    assert variants.thumbnail.name.endswith('.jpeg')
+    data = user_client.get('/api/users/me/').json()
+    assert data['avatar_thumbnail'].endswith(variants.thumbnail.name)
+    user_client.delete('/api/users/me/avatar/')
+    assert user_client.get('/api/users/me/').json()['avatar_thumbnail'] is None
+
+
+def test_unreadable_image_is_marked_failed(seed):
+    variants = ImageVariants.objects.create(source='recipes/missing.png')
+    process_pending_images()
+    variants.refresh_from_db()
+    assert variants.status == ImageVariants.Status.FAILED
+    assert variants.error
+    variants.delete()
+
+
+def test_stale_image_job_is_reclaimed(seed):
+    process_pending_images()
+    variants = ImageVariants.objects.create(source='recipes/stale.png')
+    assert claim_next_image_variants().pk == variants.pk
+    assert claim_next_image_variants() is None
+    ImageVariants.objects.filter(pk=variants.pk).update(
+        started_at=timezone.now() - timedelta(
+            seconds=settings.JOB_LEASE_TIMEOUT + 1
+        )
+    )
+    assert process_pending_images() == 1
+    variants.refresh_from_db()
+    assert variants.status == ImageVariants.Status.FAILED
+    variants.delete()
+
+
+def test_backfill_counts_inserted_rows(seed):
+    variants, _ = ImageVariants.objects.get_or_create(
+        source=seed['recipe'].image.name
+    )
+    total = ImageVariants.objects.count()
+    assert backfill_image_variants() == ImageVariants.objects.count() - total
+    assert Recipe.objects.filter(
+        pk=seed['recipe'].pk, image_variants=variants
+    ).exists()
+    variants.delete()
@@ -0,0 +1,28 @@
+from recipes.models import Ingredient
+
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+def test_search_is_case_insensitive_prefix(anon_client):
+    response = anon_client.get(INGREDIENTS_URL, {'name': 'ИНГРЕДИЕНТ 19'})
+    names = [item['name'] for item in response.json()]
+    assert names
+    assert all(name.startswith('ингредиент 19') for name in names)
+    assert names == sorted(names)
+
+
+def test_search_result_is_bounded(anon_client, settings_override):
+    settings_override(INGREDIENTS_SEARCH_LIMIT=3)
+    response = anon_client.get(INGREDIENTS_URL, {'name': 'ингр'})
+    assert len(response.json()) == 3
+
+
+def test_index_is_rebuilt_after_ingredient_changes(anon_client):
+    anon_client.get(INGREDIENTS_URL, {'name': 'ябл'})
+    ingredient = Ingredient.objects.create(
+        name='яблочный уксус', measurement_unit='мл'
+    )
+    response = anon_client.get(INGREDIENTS_URL, {'name': 'ЯБЛ'})
+    assert [item['id'] for item in response.json()] == [ingredient.id]
+    ingredient.delete()
+    assert anon_client.get(INGREDIENTS_URL, {'name': 'ябл'}).json() == []
@@ -0,0 +1,176 @@
+import statistics
+import time
+
+import pytest
+
+from api.recipe_index import recipe_ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from conftest import BENCHMARK_ROUNDS, PIXEL_PNG_DATA_URI, report
+
+RECIPES_URL = '/api/recipes/'
+
+
+def recipe_ingredients():
+    recipes = {}
+    for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ):
+        recipes.setdefault(recipe_id, set()).add(ingredient_id)
+    return recipes
+
+
+def ordered(recipe_ids):
+    return list(
+        Recipe.objects.filter(pk__in=recipe_ids).order_by(
+            '-publication_date', '-id'
+        ).values_list('id', flat=True)
+    )
+
+
+def pick_ingredients(count, offset=0):
+    recipe = Recipe.objects.order_by('id')[offset]
+    return list(
+        recipe.recipe_ingredients.order_by('ingredient_id').values_list(
+            'ingredient_id', flat=True
+        )[:count]
+    )
+
+
+def get_ids(client, query):
+    response = client.get(f'{RECIPES_URL}?{query}&limit=6')
+    assert response.status_code == 200, response.content
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+@pytest.mark.parametrize('count', [1, 3, 6])
+def test_all_mode_matches_every_ingredient(anon_client, count):
+    ingredient_ids = pick_ingredients(count, offset=count)
+    expected = ordered([
+        recipe_id for recipe_id, ingredients in recipe_ingredients().items()
+        if ingredients.issuperset(ingredient_ids)
+    ])
+    assert sorted(
+        recipe_ingredient_index.match_all(ingredient_ids)
+    ) == sorted(expected)
+    ids = ','.join(map(str, ingredient_ids))
+    assert get_ids(anon_client, f'ingredients={ids}') == expected[:6]
+
+
+@pytest.mark.parametrize('max_missing', [0, 2, 5])
+def test_coverage_mode_ranks_by_missing_ingredients(anon_client,
+                                                    max_missing):
+    have = set(pick_ingredients(8, offset=11)) | set(
+        pick_ingredients(4, offset=40)
+    )
+    expected = {}
+    for recipe_id, ingredients in recipe_ingredients().items():
+        missing = len(ingredients - have)
+        if missing <= max_missing and ingredients & have:
+            expected[recipe_id] = missing
+    assert recipe_ingredient_index.match_coverage(
+        have, max_missing
+    ) == expected
+    order = sorted(
+        ordered(expected), key=lambda recipe_id: expected[recipe_id]
+    )
+    ids = ','.join(map(str, sorted(have)))
+    assert get_ids(
+        anon_client, f'ingredients={ids}&missing={max_missing}'
+    ) == order[:6]
+
+
+@pytest.mark.parametrize('missing', ['', '&missing=100'])
+def test_ingredient_filter_applies_other_filters(anon_client, missing):
+    ingredient_ids = pick_ingredients(1, offset=5)
+    author = Recipe.objects.order_by('id')[5].author_id
+    expected = Recipe.objects.filter(
+        author=author, recipe_ingredients__ingredient__in=ingredient_ids
+    ).count()
+    response = anon_client.get(
+        f'{RECIPES_URL}?ingredients={ingredient_ids[0]}&author={author}'
+        f'{missing}'
+    )
+    assert response.status_code == 200, response.content
+    assert expected and response.data['count'] == expected
+
+
+def test_index_refreshes_incrementally(user_client, seed, monkeypatch):
+    recipe_ingredient_index.match_all([])
+    postings, _, recipe_ids = recipe_ingredient_index._snapshot
+    published = dict(postings)
+    assert recipe_ids == sorted(set(
+        RecipeIngredient.objects.values_list('recipe_id', flat=True)
+    ))
+    assert max(postings.values()).bit_length() <= len(recipe_ids)
+    recipe = Recipe.objects.filter(author=seed['reader']).order_by('id')[4]
+    ingredient_ids = [
+        Ingredient.objects.create(name=f'редкий {i}', measurement_unit='г').pk
+        for i in range(2)
+    ]
+
+    def fail_rebuild():
+        raise AssertionError('Индекс пересобран целиком')
+
+    monkeypatch.setattr(recipe_ingredient_index, '_rebuild', fail_rebuild)
+    response = user_client.patch(f'{RECIPES_URL}{recipe.id}/', {
+        'ingredients': [
+            {'id': pk, 'amount': 10} for pk in ingredient_ids
+        ],
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }, format='json')
+    assert response.status_code == 200, response.content
+    assert recipe_ingredient_index.match_all(ingredient_ids) == [recipe.id]
+    assert recipe_ingredient_index.match_coverage(ingredient_ids, 0) == {
+        recipe.id: 0
+    }
+    assert postings == published
+    response = user_client.post(RECIPES_URL, {
+        'ingredients': [{'id': ingredient_ids[0], 'amount': 1}],
+        'name': 'Новый рецепт',
+        'text': 'Добавлен после сборки индекса',
+        'cooking_time': 5,
+        'image': PIXEL_PNG_DATA_URI,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    created_id = response.json()['id']
+    assert recipe_ingredient_index.match_all(ingredient_ids[:1]) == [
+        created_id, recipe.id
+    ]
+    assert recipe_ingredient_index._snapshot[2] == recipe_ids + [created_id]
+    Recipe.objects.filter(pk=created_id).delete()
+
+
+def time_call(function):
+    timings = []
+    for _ in range(BENCHMARK_ROUNDS):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+@pytest.mark.parametrize('count', [2, 4, 8])
+def test_index_vs_chained_joins(seed, count):
+    ingredient_ids = pick_ingredients(count, offset=60)
+
+    def chained_joins():
+        queryset = Recipe.objects.all()
+        for pk in ingredient_ids:
+            queryset = queryset.filter(recipe_ingredients__ingredient=pk)
+        return sorted(queryset.values_list('id', flat=True))
+
+    recipe_ingredient_index.match_all(ingredient_ids)
+    joined, joins_ms = time_call(chained_joins)
+    indexed, index_ms = time_call(
+        lambda: sorted(recipe_ingredient_index.match_all(ingredient_ids))
+    )
+    assert indexed == joined
+    report(
+        'ingredient search',
+        ingredients=count,
+        recipes=len(indexed),
+        joins_ms=f'{joins_ms:.2f}',
+        index_ms=f'{index_ms:.3f}',
+    )
@@ -0,0 +1,111 @@
+import io
+import json
+import math
+import time
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.management.commands.load_ingredients import iter_json_array
+from recipes.models import Ingredient
+from conftest import report
+
+IMPORT_ROWS = 5000
+
+
+def load(*args):
+    output = io.StringIO()
+    call_command('load_ingredients', *args, stdout=output)
+    return output.getvalue()
+
+
+@pytest.fixture
+def catalog(tmp_path, seed):
+    def _catalog(name, content):
+        path = tmp_path / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    yield _catalog
+    Ingredient.objects.filter(name__startswith='импорт ').delete()
+
+
+def test_json_array_is_parsed_in_small_chunks():
+    items = [{'name': f'элемент {i}', 'measurement_unit': 'г'}
+             for i in range(50)]
+    stream = io.StringIO(' \n' + json.dumps(items, ensure_ascii=False))
+    assert list(iter_json_array(stream, chunk_size=7)) == items
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"name": "обрыв"'), 7))
+
+
+def test_json_and_csv_imports_are_idempotent(catalog):
+    json_path = catalog('ingredients.json', json.dumps([
+        {'name': 'импорт соль', 'measurement_unit': 'г'},
+        {'name': 'импорт вода', 'measurement_unit': 'мл'},
+        {'name': '', 'measurement_unit': 'г'},
+    ], ensure_ascii=False))
+    csv_path = catalog(
+        'ingredients.csv',
+        'name,measurement_unit\nимпорт соль,г\nимпорт мука,г\nбез единицы\n'
+    )
+    output = load(json_path)
+    assert 'Добавлено 2 новых ингредиентов' in output
+    assert 'пропущено 1' in output
+    assert 'Добавлено 1 новых ингредиентов' in load(csv_path)
+    assert 'Добавлено 0 новых ингредиентов' in load(json_path)
+    assert set(
+        Ingredient.objects.filter(name__startswith='импорт ')
+        .values_list('name', flat=True)
+    ) == {'импорт соль', 'импорт вода', 'импорт мука'}
+
+
+def test_dry_run_and_update(catalog):
+    load(catalog('first.csv', 'импорт сахар,г\n'))
+    path = catalog('second.csv', 'импорт сахар,кг\nимпорт мёд,г\n')
+    output = load(path, '--dry-run', '--update')
+    assert 'Будет добавлено 1 новых ингредиентов, обновлено 1' in output
+    assert not Ingredient.objects.filter(name='импорт мёд').exists()
+    load(path)
+    assert Ingredient.objects.get(name='импорт сахар').measurement_unit == (
+        'г'
+    )
+    load(path, '--update')
+    assert Ingredient.objects.get(name='импорт сахар').measurement_unit == (
+        'кг'
+    )
+
+
+def test_invalid_input_raises_command_error(catalog):
+    with pytest.raises(CommandError):
+        load(catalog('broken.json', '{"name": "импорт"}'))
+    with pytest.raises(CommandError):
+        load(catalog('ingredients.xml', ''))
+    with pytest.raises(CommandError):
+        load('/nonexistent/ingredients.json')
+
+
+def test_bulk_import_query_count(catalog):
+    batch_size = 1000
+    path = catalog('bulk.csv', ''.join(
+        f'импорт позиция {i},г\n' for i in range(IMPORT_ROWS)
+    ))
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        load(path, '--batch-size', str(batch_size))
+        elapsed = time.perf_counter() - start
+    batches = math.ceil(IMPORT_ROWS / batch_size)
+    report(
+        'ingredient import',
+        rows=IMPORT_ROWS,
+        batch_size=batch_size,
+        queries=len(context.captured_queries),
+        seconds=f'{elapsed:.2f}',
+    )
+    assert Ingredient.objects.filter(
+        name__startswith='импорт позиция'
+    ).count() == IMPORT_ROWS
+    assert len(context.captured_queries) <= batches * 8
@@ -0,0 +1,41 @@
+import pytest
+
+RECIPES_URL = '/api/recipes/'
+USERS_URL = '/api/users/'
+
+
+@pytest.mark.parametrize('url, max_queries', [
+    (RECIPES_URL, 0),
+    (f'{RECIPES_URL}?limit=6&page=2', 0),
+    (f'{RECIPES_URL}?author=2', 0),
+    (f'{RECIPES_URL}?pagination=cursor&ordering=-favorites_count', 0),
+    ('/api/ingredients/', 0),
+    ('/api/ingredients/?name=ингредиент 1', 0),
+    (USERS_URL, 3),
+])
+def test_anonymous_endpoints(anon_client, measure, url, max_queries):
+    measure(anon_client, url, max_queries)
+
+
+@pytest.mark.parametrize('url, max_queries', [
+    (RECIPES_URL, 3),
+    (f'{RECIPES_URL}?is_favorited=1', 3),
+    (f'{RECIPES_URL}?is_in_shopping_cart=1', 3),
+    (USERS_URL, 4),
+    (f'{USERS_URL}me/', 1),
+    (f'{USERS_URL}subscriptions/', 4),
+    (f'{USERS_URL}subscriptions/?recipes_limit=2', 4),
+    (f'{RECIPES_URL}download_shopping_cart/', 0),
+])
+def test_authenticated_endpoints(user_client, measure, url, max_queries):
+    measure(user_client, url, max_queries)
+
+
+def test_recipe_detail(anon_client, user_client, measure, seed):
+    url = f'{RECIPES_URL}{seed["recipe"].id}/'
+    measure(anon_client, url, 0)
+    measure(user_client, url, 2)
+
+
+def test_user_detail(user_client, measure, seed):
+    measure(user_client, f'{USERS_URL}{seed["reader"].id}/', 3)
@@ -0,0 +1,49 @@
+import pytest
+
+from recipes.models import Recipe
+
+RECIPES_URL = '/api/recipes/'
+
+
+def walk_cursor_pages(client, params):
+    ids = []
+    response = client.get(RECIPES_URL, {**params, 'pagination': 'cursor'})
+    while True:
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data
+        ids.extend(recipe['id'] for recipe in data['results'])
+        if data['next'] is None:
+            return ids
+        response = client.get(data['next'])
+
+
+@pytest.mark.parametrize('ordering, order_by', [
+    (None, ('-publication_date', '-id')),
+    ('-favorites_count', ('-favorites_count', '-id')),
+    ('favorites_count', ('favorites_count', 'id')),
+    ('cooking_time', ('cooking_time', 'id')),
+    ('-cooking_time', ('-cooking_time', '-id')),
+])
+def test_cursor_pagination_walks_every_recipe_once(
+    anon_client, ordering, order_by
+):
+    params = {'ordering': ordering} if ordering else {}
+    ids = walk_cursor_pages(anon_client, params)
+    assert ids == list(
+        Recipe.objects.order_by(*order_by).values_list('id', flat=True)
+    )
+
+
+def test_page_number_ordering_by_popularity(anon_client):
+    response = anon_client.get(RECIPES_URL, {'ordering': '-favorites_count'})
+    counts = [
+        Recipe.objects.get(pk=recipe['id']).favorites_count
+        for recipe in response.json()['results']
+    ]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_invalid_cursor(anon_client):
+    response = anon_client.get(RECIPES_URL, {'cursor': 'garbage'})
+    assert response.status_code == 404
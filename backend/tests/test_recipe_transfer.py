@@ -0,0 +1,151 @@
+import io
+import json
+import os
+import time
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.management.commands.import_recipes import parse_recipe
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+from conftest import INGREDIENTS_PER_RECIPE, report
+
+IMPORT_RECIPES = int(os.getenv('BENCHMARK_IMPORT_RECIPES', 1000))
+IMPORT_PREFIX = 'импорт рецепт'
+
+
+def export_lines():
+    output = io.StringIO()
+    call_command('export_recipes', stdout=output, stderr=io.StringIO())
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def import_file(path, *args):
+    output = io.StringIO()
+    call_command('import_recipes', path, *args, stdout=output)
+    return output.getvalue()
+
+
+def remove_imported():
+    Recipe.objects.filter(name__startswith=IMPORT_PREFIX).delete()
+    Ingredient.objects.filter(name__startswith=IMPORT_PREFIX).delete()
+
+
+def test_export_contains_every_recipe(seed):
+    lines = export_lines()
+    assert len(lines) == Recipe.objects.count()
+    first = Recipe.objects.order_by('pk').first()
+    assert lines[0]['name'] == first.name
+    assert lines[0]['author'] == first.author.email
+    assert lines[0]['image'] == first.image.name
+    assert sorted(item['name'] for item in lines[0]['ingredients']) == sorted(
+        first.recipe_ingredients.values_list('ingredient__name', flat=True)
+    )
+
+
+def test_round_trip_import(seed, tmp_path):
+    path = tmp_path / 'recipes.jsonl'
+    lines = export_lines()[:3]
+    lines[0]['ingredients'].append({
+        'name': f'{IMPORT_PREFIX} шафран',
+        'measurement_unit': 'г',
+        'amount': 2,
+    })
+    for line in lines:
+        line['name'] = f'{IMPORT_PREFIX} {line["name"]}'
+    broken = dict(lines[1], author='nobody@example.com')
+    path.write_text('\n'.join(
+        [json.dumps(line, ensure_ascii=False) for line in lines]
+        + [json.dumps(broken, ensure_ascii=False), '{"name": "обрыв"']
+    ), encoding='utf-8')
+    author = User.objects.get(email=lines[0]['author'])
+    recipes_count = author.recipes_count
+    try:
+        output = import_file(str(path), '--transaction-size', '2')
+        assert 'Импортировано 3 рецептов' in output
+        assert 'новых ингредиентов 1' in output
+        assert 'пропущено 2' in output
+        imported = Recipe.objects.filter(
+            name__startswith=IMPORT_PREFIX
+        ).order_by('pk')
+        assert [recipe.name for recipe in imported] == [
+            line['name'] for line in lines
+        ]
+        assert imported[0].recipe_ingredients.count() == (
+            INGREDIENTS_PER_RECIPE + 1
+        )
+        author.refresh_from_db()
+        assert author.recipes_count == recipes_count + sum(
+            line['author'] == author.email for line in lines
+        )
+    finally:
+        remove_imported()
+
+
+VALID_LINE = {
+    'author': 'author@foodgram.ru',
+    'name': 'Блины',
+    'text': 'Смешать и пожарить',
+    'cooking_time': 20,
+    'image': 'recipes/seed.png',
+    'ingredients': [
+        {'name': 'мука', 'measurement_unit': 'г', 'amount': 200},
+    ],
+}
+
+
+@pytest.mark.parametrize('ingredient, field, value', [
+    (False, 'cooking_time', 32001),
+    (False, 'text', None),
+    (False, 'text', ''),
+    (False, 'name', ['Блины']),
+    (True, 'measurement_unit', None),
+    (True, 'measurement_unit', 'г' * 65),
+])
+def test_parse_recipe_rejects_invalid_values(ingredient, field, value):
+    assert parse_recipe(1, json.dumps(VALID_LINE))['cooking_time'] == 20
+    data = json.loads(json.dumps(VALID_LINE))
+    (data['ingredients'][0] if ingredient else data)[field] = value
+    with pytest.raises(ValueError):
+        parse_recipe(1, json.dumps(data))
+
+
+def test_import_throughput(seed, tmp_path):
+    template = export_lines()[0]
+    path = tmp_path / 'bulk.jsonl'
+    with open(path, 'w', encoding='utf-8') as file:
+        for index in range(IMPORT_RECIPES):
+            file.write(json.dumps(
+                dict(template, name=f'{IMPORT_PREFIX} {index}'),
+                ensure_ascii=False
+            ) + '\n')
+    try:
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            import_file(str(path), '--transaction-size', '500')
+            elapsed = time.perf_counter() - start
+        report(
+            'recipe import / export',
+            command='import_recipes',
+            recipes=IMPORT_RECIPES,
+            queries=len(context.captured_queries),
+            recipes_per_sec=f'{IMPORT_RECIPES / elapsed:.0f}',
+        )
+        assert RecipeIngredient.objects.filter(
+            recipe__name__startswith=IMPORT_PREFIX
+        ).count() == IMPORT_RECIPES * len(template['ingredients'])
+        assert len(context.captured_queries) < IMPORT_RECIPES / 10
+        start = time.perf_counter()
+        exported = len(export_lines())
+        report(
+            'recipe import / export',
+            command='export_recipes',
+            recipes=exported,
+            queries='',
+            recipes_per_sec=f'{exported / (time.perf_counter() - start):.0f}',
+        )
+    finally:
+        remove_imported()
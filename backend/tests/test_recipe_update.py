@@ -0,0 +1,158 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, Recipe
+from conftest import PIXEL_PNG_DATA_URI
+
+
+def patch_ingredients(client, recipe, ingredients, **fields):
+    with CaptureQueriesContext(connection) as context:
+        response = client.patch(f'/api/recipes/{recipe.id}/', {
+            'ingredients': ingredients,
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            **fields,
+        }, format='json')
+    assert response.status_code == 200, response.content
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'recipe_ingredient' in query['sql']
+        and not query['sql'].startswith('SELECT')
+    ]
+
+
+def current_ingredients(recipe):
+    return [
+        {'id': row.ingredient_id, 'amount': row.amount}
+        for row in recipe.recipe_ingredients.order_by('id')
+    ]
+
+
+def test_text_only_update_keeps_ingredient_rows(user_client, seed):
+    recipe = Recipe.objects.filter(author=seed['reader']).order_by('id')[2]
+    row_ids = list(recipe.recipe_ingredients.values_list('id', flat=True))
+    writes = patch_ingredients(
+        user_client, recipe, current_ingredients(recipe),
+        text='Исправлена опечатка'
+    )
+    assert writes == []
+    assert list(
+        recipe.recipe_ingredients.values_list('id', flat=True)
+    ) == row_ids
+
+
+def test_update_applies_only_the_diff(user_client, seed):
+    recipe = Recipe.objects.filter(author=seed['reader']).order_by('id')[3]
+    ingredients = current_ingredients(recipe)
+    removed, changed, *kept = ingredients
+    added = Ingredient.objects.exclude(
+        id__in=[item['id'] for item in ingredients]
+    ).order_by('id').first()
+    removed_ingredient = Ingredient.objects.get(pk=removed['id'])
+    added_count = added.recipes_count
+    removed_count = removed_ingredient.recipes_count
+    kept_rows = {
+        row.ingredient_id: row.id for row in recipe.recipe_ingredients.all()
+    }
+    writes = patch_ingredients(user_client, recipe, [
+        {'id': changed['id'], 'amount': changed['amount'] + 1},
+        *kept,
+        {'id': added.id, 'amount': 4},
+    ])
+    assert len(writes) <= 4
+    rows = {
+        row.ingredient_id: row for row in recipe.recipe_ingredients.all()
+    }
+    assert removed['id'] not in rows
+    assert rows[changed['id']].amount == changed['amount'] + 1
+    assert rows[added.id].amount == 4
+    for item in [changed, *kept]:
+        assert rows[item['id']].id == kept_rows[item['id']]
+    added.refresh_from_db()
+    removed_ingredient.refresh_from_db()
+    assert added.recipes_count == added_count + 1
+    assert removed_ingredient.recipes_count == removed_count - 1
+    call_command(
+        'rebuild_shopping_cart_totals', verify=True, stdout=io.StringIO()
+    )
+
+
+def create_recipe(client, ingredients):
+    with CaptureQueriesContext(connection) as context:
+        response = client.post('/api/recipes/', {
+            'ingredients': ingredients,
+            'image': PIXEL_PNG_DATA_URI,
+            'name': 'Много ингредиентов',
+            'text': 'Проверка числа запросов',
+            'cooking_time': 10,
+        }, format='json')
+    return response, len(context.captured_queries)
+
+
+def test_write_queries_do_not_depend_on_ingredient_count(user_client):
+    ingredient_ids = list(
+        Ingredient.objects.order_by('id').values_list('id', flat=True)[:40]
+    )
+    created = []
+    try:
+        counts = []
+        for size in (5, 40):
+            response, queries = create_recipe(user_client, [
+                {'id': pk, 'amount': 1} for pk in ingredient_ids[:size]
+            ])
+            assert response.status_code == 201, response.content
+            created.append(response.json()['id'])
+            counts.append(queries)
+        assert counts[0] == counts[1]
+    finally:
+        for recipe in Recipe.objects.filter(pk__in=created):
+            recipe.delete()
+
+
+def test_removal_queries_do_not_depend_on_removed_count(user_client):
+    ingredients = [
+        {'id': pk, 'amount': 1}
+        for pk in Ingredient.objects.order_by('id').values_list(
+            'id', flat=True
+        )[:21]
+    ]
+    created = []
+    try:
+        counts = []
+        for kept in (20, 1):
+            response, _ = create_recipe(user_client, ingredients)
+            assert response.status_code == 201, response.content
+            recipe = Recipe.objects.get(pk=response.json()['id'])
+            created.append(recipe.pk)
+            counts_before = dict(Ingredient.objects.filter(
+                pk__in=[item['id'] for item in ingredients[kept:]]
+            ).values_list('id', 'recipes_count'))
+            with CaptureQueriesContext(connection) as context:
+                patch_ingredients(user_client, recipe, ingredients[:kept])
+            counts.append(len(context.captured_queries))
+            assert recipe.recipe_ingredients.count() == kept
+            assert dict(Ingredient.objects.filter(
+                pk__in=counts_before
+            ).values_list('id', 'recipes_count')) == {
+                pk: count - 1 for pk, count in counts_before.items()
+            }
+        assert counts[0] == counts[1]
+    finally:
+        for recipe in Recipe.objects.filter(pk__in=created):
+            recipe.delete()
+
+
+def test_missing_ingredient_ids_are_reported_together(user_client):
+    existing = Ingredient.objects.order_by('id').first()
+    response, _ = create_recipe(user_client, [
+        {'id': existing.id, 'amount': 1},
+        {'id': 999998, 'amount': 1},
+        {'id': 999999, 'amount': 2},
+    ])
+    assert response.status_code == 400
+    message = str(response.json()['ingredients'])
+    assert '999998' in message and '999999' in message
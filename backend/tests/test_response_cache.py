@@ -0,0 +1,133 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.checks import check_shared_cache
+from recipes.models import Favorite, Ingredient, Recipe
+from users.models import User
+
+RECIPES_URL = '/api/recipes/'
+
+
+def get_without_queries(client, url, **headers):
+    client.get(url)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, **headers)
+    assert len(context.captured_queries) == 0
+    return response
+
+
+def test_anonymous_list_is_served_from_cache(anon_client, seed):
+    response = get_without_queries(anon_client, f'{RECIPES_URL}?limit=3')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 3
+    assert response['ETag']
+    assert response['Last-Modified']
+
+
+def test_authenticated_responses_are_not_cached(user_client):
+    user_client.get(RECIPES_URL)
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(RECIPES_URL)
+    assert response.status_code == 200
+    assert len(context.captured_queries) > 0
+
+
+def test_conditional_get_returns_not_modified(anon_client, seed):
+    url = f'{RECIPES_URL}{seed["recipe"].id}/'
+    response = anon_client.get(url)
+    not_modified = get_without_queries(
+        anon_client, url, HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert not_modified.status_code == 304
+    assert not_modified['ETag'] == response['ETag']
+    not_modified = anon_client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+    )
+    assert not_modified.status_code == 304
+    assert anon_client.get(
+        url, HTTP_IF_NONE_MATCH='"stale"'
+    ).status_code == 200
+
+
+def test_recipe_change_invalidates_list_and_detail(anon_client):
+    recipe = Recipe.objects.order_by('id')[2]
+    url = f'{RECIPES_URL}{recipe.id}/'
+    list_url = f'{RECIPES_URL}?author={recipe.author_id}'
+    etag = anon_client.get(url)['ETag']
+    anon_client.get(list_url)
+    recipe.name = 'Обновлённое название'
+    recipe.save()
+    response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['name'] == recipe.name
+    assert recipe.name in [
+        item['name'] for item in anon_client.get(list_url).json()['results']
+    ]
+
+
+def test_other_recipe_detail_stays_cached(anon_client):
+    first, second = Recipe.objects.order_by('id')[3:5]
+    url = f'{RECIPES_URL}{first.id}/'
+    anon_client.get(url)
+    second.save()
+    get_without_queries(anon_client, url)
+
+
+def test_author_change_invalidates_recipes(anon_client):
+    recipe = Recipe.objects.order_by('id')[5]
+    url = f'{RECIPES_URL}{recipe.id}/'
+    anon_client.get(url)
+    author = User.objects.get(pk=recipe.author_id)
+    author.first_name = 'Переименованный'
+    author.save(update_fields=['first_name'])
+    assert anon_client.get(url).json()['author']['first_name'] == (
+        'Переименованный'
+    )
+    author.save(update_fields=['last_login'])
+    get_without_queries(anon_client, url)
+
+
+def test_ingredient_change_invalidates_recipes(anon_client):
+    recipe = Recipe.objects.order_by('id')[6]
+    url = f'{RECIPES_URL}{recipe.id}/'
+    anon_client.get(url)
+    ingredient = Ingredient.objects.get(
+        pk=recipe.recipe_ingredients.first().ingredient_id
+    )
+    ingredient.measurement_unit = 'щепотка'
+    ingredient.save()
+    assert 'щепотка' in [
+        item['measurement_unit']
+        for item in anon_client.get(url).json()['ingredients']
+    ]
+
+
+def test_favorite_invalidates_only_favorites_ordering(anon_client, seed):
+    url = f'{RECIPES_URL}?ordering=-favorites_count'
+    anon_client.get(url)
+    anon_client.get(RECIPES_URL)
+    Favorite.objects.create(
+        user=seed['reader'], recipe=Recipe.objects.order_by('id')[1]
+    )
+    get_without_queries(anon_client, RECIPES_URL)
+    with CaptureQueriesContext(connection) as context:
+        anon_client.get(url)
+    assert len(context.captured_queries) > 0
+
+
+def test_process_local_cache_is_reported(settings_override):
+    locmem = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    filebased = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/foodgram-check-cache',
+    }}
+    settings_override(DEBUG=False, CACHES=locmem)
+    assert [warning.id for warning in check_shared_cache(None)] == [
+        'api.W001'
+    ]
+    settings_override(DEBUG=True)
+    assert check_shared_cache(None) == []
+    settings_override(DEBUG=False, CACHES=filebased)
+    assert check_shared_cache(None) == []
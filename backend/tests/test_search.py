@@ -0,0 +1,13 @@
+def test_recipe_search_matches_substring(anon_client):
+    response = anon_client.get('/api/recipes/', {'search': 'user3 №'})
+    names = [recipe['name'] for recipe in response.json()['results']]
+    assert names
+    assert all('user3 №' in name for name in names)
+
+
+def test_ingredient_search_is_bounded(anon_client, settings_override):
+    settings_override(INGREDIENTS_SEARCH_LIMIT=4)
+    response = anon_client.get('/api/ingredients/', {'search': 'диент 1'})
+    names = [item['name'] for item in response.json()]
+    assert len(names) == 4
+    assert all('диент 1' in name for name in names)
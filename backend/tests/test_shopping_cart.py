@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.exports import (
+    EXPORT_SUPERSEDED,
+    RESPOND_ASYNC,
+    claim_next_export,
+    process_export,
+    process_pending_exports,
+)
+from recipes.models import (
+    Recipe, RecipeIngredient, ShoppingCart, ShoppingCartExport)
+from users.models import User
+from conftest import BENCHMARK_ROUNDS, INGREDIENTS_PER_RECIPE, report
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+EXPORTS_URL = '/api/recipes/shopping_cart_exports/'
+CART_SIZES = tuple(
+    int(size)
+    for size in os.getenv('BENCHMARK_CART_SIZES', '10,100,1000').split(',')
+)
+FORMATS = ('pdf', 'txt', 'csv', 'json')
+
+
+def download(client, **params):
+    response = client.get(DOWNLOAD_URL, params)
+    assert response.status_code == 200
+    return response, b''.join(response.streaming_content)
+
+
+def test_pdf_is_invalidated_when_cart_changes(user_client, seed):
+    recipe_url = f'/api/recipes/{seed["recipe"].id}/shopping_cart/'
+    _, first = download(user_client)
+    assert user_client.delete(recipe_url).status_code == 204
+    assert download(user_client)[1] != first
+    assert user_client.post(recipe_url).status_code == 201
+    assert download(user_client)[1] == first
+
+
+@pytest.mark.parametrize('export_format, content_type', [
+    ('pdf', 'application/pdf'),
+    ('txt', 'text/plain; charset=utf-8'),
+    ('csv', 'text/csv; charset=utf-8'),
+    ('json', 'application/json; charset=utf-8'),
+])
+def test_export_formats(user_client, export_format, content_type):
+    response, content = download(user_client, format=export_format)
+    assert response['Content-Type'] == content_type
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="shopping_cart.{export_format}"'
+    )
+    assert content
+
+
+def test_export_formats_agree(user_client):
+    items = json.loads(download(user_client, format='json')[1])
+    rows = list(csv.reader(io.StringIO(
+        download(user_client, format='csv')[1].decode()
+    )))
+    lines = download(user_client, format='txt')[1].decode().splitlines()
+    assert items
+    assert len(rows) == len(items) + 1
+    assert len(lines) == len(items) + 2
+    for item, row in zip(items, rows[1:]):
+        assert row == [
+            item['name'], str(item['amount']), item['measurement_unit']
+        ]
+
+
+def test_anonymous_export_error_is_json(anon_client):
+    response = anon_client.get(DOWNLOAD_URL, {'format': 'pdf'})
+    assert response.status_code == 401
+    assert response['Content-Type'] == 'application/json'
+    assert 'detail' in response.json()
+
+
+def test_large_cart_is_rendered_in_background(
+    user_client, seed, settings_override
+):
+    settings_override(SHOPPING_CART_SYNC_LIMIT=1)
+    cache.clear()
+    legacy, legacy_content = download(user_client)
+    assert legacy['Content-Type'] == 'application/pdf'
+    cache.clear()
+    response = user_client.get(DOWNLOAD_URL, HTTP_PREFER=RESPOND_ASYNC)
+    assert response.status_code == 202
+    export = response.json()
+    assert export['status'] == ShoppingCartExport.Status.PENDING
+    assert response['Location'].endswith(f'{EXPORTS_URL}{export["id"]}/')
+    assert user_client.get(
+        DOWNLOAD_URL, HTTP_PREFER=RESPOND_ASYNC
+    ).json()['id'] == export['id']
+
+    assert process_pending_exports() == 1
+    status = user_client.get(f'{EXPORTS_URL}{export["id"]}/').json()
+    assert status['status'] == ShoppingCartExport.Status.DONE
+    file_response = user_client.get(status['download_url'])
+    assert file_response['Content-Type'] == 'application/pdf'
+    content = b''.join(file_response.streaming_content)
+
+    settings_override(SHOPPING_CART_SYNC_LIMIT=1000)
+    assert download(user_client)[1] == content
+    seed['reader'].shopping_cart_exports.all().delete()
+
+
+def test_export_job_can_be_requested_explicitly(user_client, seed):
+    response = user_client.post(EXPORTS_URL, {'format': 'csv'})
+    assert response.status_code == 202
+    export_id = response.json()['id']
+    assert process_pending_exports() == 1
+    file_response = user_client.get(f'{EXPORTS_URL}{export_id}/download/')
+    assert file_response.status_code == 200
+    assert b''.join(file_response.streaming_content) == (
+        download(user_client, format='csv')[1]
+    )
+    assert user_client.post(
+        EXPORTS_URL, {'format': 'xls'}
+    ).status_code == 400
+    seed['reader'].shopping_cart_exports.all().delete()
+
+
+def request_export(client):
+    response = client.post(EXPORTS_URL, {'format': 'txt'})
+    assert response.status_code == 202
+    return ShoppingCartExport.objects.get(pk=response.json()['id'])
+
+
+def test_stale_exports_are_reclaimed_and_superseded(user_client, seed):
+    recipe_url = f'/api/recipes/{seed["recipe"].id}/shopping_cart/'
+    old = request_export(user_client)
+    assert process_pending_exports() == 1
+    old.refresh_from_db()
+    assert old.status == ShoppingCartExport.Status.DONE
+    assert default_storage.exists(old.file.name)
+
+    assert user_client.delete(recipe_url).status_code == 204
+    new = request_export(user_client)
+    assert claim_next_export().pk == new.pk
+    assert claim_next_export() is None
+    ShoppingCartExport.objects.filter(pk=new.pk).update(
+        started_at=timezone.now() - timedelta(
+            seconds=settings.JOB_LEASE_TIMEOUT + 1
+        )
+    )
+    assert process_pending_exports() == 1
+    new.refresh_from_db()
+    assert new.status == ShoppingCartExport.Status.DONE
+    assert not ShoppingCartExport.objects.filter(pk=old.pk).exists()
+    assert not default_storage.exists(old.file.name)
+
+    assert user_client.post(recipe_url).status_code == 201
+    request_export(user_client)
+    export = claim_next_export()
+    assert user_client.delete(recipe_url).status_code == 204
+    process_export(export)
+    export.refresh_from_db()
+    assert export.status == ShoppingCartExport.Status.FAILED
+    assert export.error == EXPORT_SUPERSEDED
+    assert not export.file
+    assert user_client.post(recipe_url).status_code == 201
+    seed['reader'].shopping_cart_exports.all().delete()
+
+
+@pytest.fixture(scope='module')
+def cart_clients(seed):
+    author = User.objects.create(
+        username='cart_author', email='cart_author@foodgram.ru'
+    )
+    recipe = seed['recipe']
+    Recipe.objects.bulk_create([
+        Recipe(
+            author=author,
+            name=f'Рецепт для корзины №{i}',
+            image=recipe.image.name,
+            text=recipe.text,
+            cooking_time=recipe.cooking_time,
+        ) for i in range(max(CART_SIZES))
+    ])
+    recipes = list(author.recipes.order_by('id'))
+    ingredients = list(
+        RecipeIngredient.objects
+        .values_list('ingredient_id', flat=True)
+        .distinct()
+    )
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient_id=ingredients[(index + j) % len(ingredients)],
+            amount=j + 1,
+        )
+        for index, recipe in enumerate(recipes)
+        for j in range(INGREDIENTS_PER_RECIPE)
+    ])
+    clients = {}
+    for size in CART_SIZES:
+        user = User.objects.create(
+            username=f'cart_{size}', email=f'cart_{size}@foodgram.ru'
+        )
+        ShoppingCart.objects.bulk_create([
+            ShoppingCart(user=user, recipe=recipe)
+            for recipe in recipes[:size]
+        ])
+        clients[size] = APIClient()
+        clients[size].force_authenticate(user)
+    call_command('rebuild_shopping_cart_totals', stdout=io.StringIO())
+    call_command('recount', stdout=io.StringIO())
+    yield clients
+    User.objects.filter(
+        username__in=['cart_author', *(f'cart_{s}' for s in CART_SIZES)]
+    ).delete()
+
+
+@pytest.mark.parametrize('size', CART_SIZES)
+@pytest.mark.parametrize('export_format', FORMATS)
+def test_export_format_benchmark(cart_clients, settings_override, size,
+                                 export_format):
+    settings_override(SHOPPING_CART_SYNC_LIMIT=max(CART_SIZES))
+    client = cart_clients[size]
+    timings = []
+    peaks = []
+    for _ in range(BENCHMARK_ROUNDS):
+        cache.clear()
+        tracemalloc.start()
+        start = time.perf_counter()
+        _, content = download(client, format=export_format)
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    report(
+        'shopping cart export formats (uncached)',
+        format=export_format,
+        recipes=size,
+        bytes=len(content),
+        median_ms=f'{statistics.median(timings) * 1000:.2f}',
+        peak_kib=f'{max(peaks) / 1024:.1f}',
+    )
@@ -0,0 +1,73 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recipes.models import (
+    Ingredient, Recipe, ShoppingCart, ShoppingCartIngredient)
+
+
+def verify_totals():
+    call_command(
+        'rebuild_shopping_cart_totals', verify=True, stdout=io.StringIO()
+    )
+
+
+def test_totals_follow_cart_changes(user_client):
+    recipe = Recipe.objects.order_by('id')[1]
+    url = f'/api/recipes/{recipe.id}/shopping_cart/'
+    assert user_client.post(url).status_code == 201
+    verify_totals()
+    assert user_client.delete(url).status_code == 204
+    verify_totals()
+
+
+def test_totals_follow_cart_rows_saved_outside_views(seed):
+    recipe = Recipe.objects.exclude(
+        user_shopping_cart__user=seed['reader']
+    ).order_by('id')[2]
+    ShoppingCartIngredient.objects.get_or_create(
+        user=seed['reader'],
+        ingredient=recipe.recipe_ingredients.first().ingredient,
+        defaults={'total_amount': 0},
+    )
+    cart_item = ShoppingCart.objects.create(
+        user=seed['reader'], recipe=recipe
+    )
+    verify_totals()
+    cart_item.delete()
+    verify_totals()
+
+
+def test_totals_follow_recipe_ingredient_changes(user_client, seed):
+    recipe = seed['recipe']
+    ingredients = [
+        {'id': item.ingredient_id, 'amount': item.amount + 3}
+        for item in recipe.recipe_ingredients.all()[1:]
+    ]
+    ingredients.append({'id': Ingredient.objects.last().id, 'amount': 5})
+    response = user_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {'ingredients': ingredients, 'name': recipe.name,
+         'text': recipe.text, 'cooking_time': recipe.cooking_time},
+        format='json'
+    )
+    assert response.status_code == 200
+    verify_totals()
+
+
+def test_totals_follow_recipe_deletion(user_client, seed):
+    recipe = Recipe.objects.order_by('id')[3]
+    assert recipe.user_shopping_cart.exists()
+    recipe.delete()
+    verify_totals()
+
+
+def test_verify_reports_drift(seed):
+    row = ShoppingCartIngredient.objects.first()
+    row.total_amount += 1
+    row.save()
+    with pytest.raises(CommandError):
+        verify_totals()
+    call_command('rebuild_shopping_cart_totals', stdout=io.StringIO())
+    verify_totals()
@@ -0,0 +1,166 @@
+import io
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.similarity import process_pending_similarity
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, SimilarityRefresh)
+from conftest import PIXEL_PNG_DATA_URI, report
+
+SIMILAR_MAX_QUERIES = 4
+
+
+def similar_url(recipe_id):
+    return f'/api/recipes/{recipe_id}/similar/'
+
+
+def brute_force_similar(recipe_id, count):
+    recipes = {}
+    for owner_id, ingredient_id in RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ):
+        recipes.setdefault(owner_id, set()).add(ingredient_id)
+    ingredients = recipes[recipe_id]
+    scores = sorted(
+        (
+            (len(ingredients & other) / len(ingredients | other), other_id)
+            for other_id, other in recipes.items()
+            if other_id != recipe_id and ingredients & other
+        ),
+        reverse=True,
+    )
+    return [other_id for _, other_id in scores[:count]]
+
+
+def test_similar_matches_brute_force(anon_client, seed):
+    start = time.perf_counter()
+    call_command('build_similar_recipes', stdout=io.StringIO())
+    report(
+        'similar recipes',
+        recipes=Recipe.objects.count(),
+        build_ms=f'{(time.perf_counter() - start) * 1000:.1f}',
+    )
+    recipe = Recipe.objects.order_by('id')[30]
+    with CaptureQueriesContext(connection) as context:
+        response = anon_client.get(similar_url(recipe.id))
+    assert response.status_code == 200
+    assert len(context.captured_queries) <= SIMILAR_MAX_QUERIES
+    assert [item['id'] for item in response.json()] == brute_force_similar(
+        recipe.id, settings.SIMILAR_RECIPES_COUNT
+    )
+
+
+def test_similar_for_missing_recipe(anon_client):
+    assert anon_client.get(similar_url(10 ** 9)).status_code == 404
+
+
+def test_new_recipe_gets_neighbours_incrementally(user_client, seed):
+    original = Recipe.objects.order_by('id')[40]
+    ingredients = [
+        {'id': row.ingredient_id, 'amount': row.amount}
+        for row in original.recipe_ingredients.all()
+    ]
+    response = user_client.post('/api/recipes/', {
+        'ingredients': ingredients,
+        'name': 'Копия рецепта',
+        'text': 'Те же ингредиенты',
+        'cooking_time': 10,
+        'image': PIXEL_PNG_DATA_URI,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    copy_id = response.json()['id']
+    assert user_client.get(similar_url(copy_id)).json() == []
+    process_pending_similarity()
+    similar = user_client.get(similar_url(copy_id)).json()
+    assert similar[0]['id'] == original.id
+    assert [item['id'] for item in similar] == brute_force_similar(
+        copy_id, settings.SIMILAR_RECIPES_COUNT
+    )
+    reverse = user_client.get(similar_url(original.id)).json()
+    assert reverse[0]['id'] == copy_id
+
+    def similar_ids(recipe_id):
+        return [
+            item['id']
+            for item in user_client.get(similar_url(recipe_id)).json()
+        ]
+
+    rare = Ingredient.objects.create(
+        name='похожий редкий', measurement_unit='г'
+    )
+    response = user_client.patch(f'/api/recipes/{copy_id}/', {
+        'ingredients': [{'id': rare.id, 'amount': 1}],
+        'name': 'Копия рецепта',
+        'text': 'Другие ингредиенты',
+        'cooking_time': 10,
+    }, format='json')
+    assert response.status_code == 200, response.content
+    process_pending_similarity()
+    assert similar_ids(original.id) == brute_force_similar(
+        original.id, settings.SIMILAR_RECIPES_COUNT
+    )
+    response = user_client.patch(f'/api/recipes/{copy_id}/', {
+        'ingredients': ingredients,
+        'name': 'Копия рецепта',
+        'text': 'Те же ингредиенты',
+        'cooking_time': 10,
+    }, format='json')
+    assert response.status_code == 200, response.content
+    process_pending_similarity()
+    assert similar_ids(original.id)[0] == copy_id
+    Recipe.objects.filter(pk=copy_id).delete()
+    rare.delete()
+    process_pending_similarity()
+    assert copy_id not in similar_ids(original.id)
+    assert similar_ids(original.id) == brute_force_similar(
+        original.id, settings.SIMILAR_RECIPES_COUNT
+    )
+
+
+def test_only_ingredient_changes_queue_refresh(user_client, seed):
+    ingredients = [
+        {'id': pk, 'amount': 1}
+        for pk in Ingredient.objects.order_by('id').values_list(
+            'id', flat=True
+        )[:3]
+    ]
+    fields = {
+        'name': 'Очередь похожих',
+        'text': 'Проверка очереди',
+        'cooking_time': 10,
+    }
+    response = user_client.post('/api/recipes/', {
+        'ingredients': ingredients,
+        'image': PIXEL_PNG_DATA_URI,
+        **fields,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    recipe_id = response.json()['id']
+    url = f'/api/recipes/{recipe_id}/'
+    try:
+        process_pending_similarity()
+        response = user_client.patch(url, {
+            'ingredients': [
+                {**item, 'amount': item['amount'] + 1} for item in ingredients
+            ],
+            **fields,
+        }, format='json')
+        assert response.status_code == 200, response.content
+        assert not SimilarityRefresh.objects.exists()
+        for items in (ingredients[1:], ingredients, ingredients[1:]):
+            response = user_client.patch(url, {
+                'ingredients': items, **fields
+            }, format='json')
+            assert response.status_code == 200, response.content
+        assert list(SimilarityRefresh.objects.values_list(
+            'recipe_id', 'kind'
+        )) == [(recipe_id, SimilarityRefresh.Kind.REFRESH)]
+        assert process_pending_similarity() == 1
+        assert not SimilarityRefresh.objects.exists()
+    finally:
+        Recipe.objects.filter(pk=recipe_id).delete()
+        process_pending_similarity()
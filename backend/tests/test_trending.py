@@ -0,0 +1,131 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.trending import compute_trending_scores
+from recipes.models import Favorite, Recipe, ShoppingCart, TrendingScore
+
+TRENDING_URL = '/api/recipes/?ordering=trending'
+
+
+def expected_order():
+    return list(
+        TrendingScore.objects.order_by('-score', '-recipe_id').values_list(
+            'recipe_id', flat=True
+        )
+    )
+
+
+def recipes_with_interactions():
+    return Recipe.objects.annotate(
+        favorites=Count('favorite_recipes', distinct=True),
+        carts=Count('user_shopping_cart', distinct=True),
+    ).filter(favorites__gt=0, carts__gt=0).order_by('id')
+
+
+@pytest.fixture
+def aged_recipe(seed):
+    recipe = recipes_with_interactions()[1]
+    aged_at = timezone.now() - timedelta(
+        hours=2 * settings.TRENDING_HALF_LIFE_HOURS
+    )
+    favorites = Favorite.objects.filter(recipe=recipe)
+    original = list(favorites.values_list('pk', 'created_at'))
+    favorites.update(created_at=aged_at)
+    yield recipe
+    for pk, created_at in original:
+        Favorite.objects.filter(pk=pk).update(created_at=created_at)
+
+
+def fresh_recipe_like(recipe):
+    counts = recipes_with_interactions().get(pk=recipe.pk)
+    return recipes_with_interactions().exclude(pk=recipe.pk).filter(
+        favorites__gte=counts.favorites, carts__gte=counts.carts
+    ).first()
+
+
+def test_scores_decay_with_age(aged_recipe):
+    now = timezone.now()
+    scores = compute_trending_scores(now)
+    favorites = aged_recipe.favorite_recipes.count()
+    carts = aged_recipe.user_shopping_cart.count()
+    assert favorites and carts
+    assert scores[aged_recipe.id] == pytest.approx(
+        favorites / 4 + carts * settings.TRENDING_SHOPPING_CART_WEIGHT,
+        rel=0.05,
+    )
+    fresh = fresh_recipe_like(aged_recipe)
+    assert scores[fresh.id] > scores[aged_recipe.id]
+
+
+def test_interactions_beyond_horizon_are_ignored(seed, settings_override):
+    settings_override(TRENDING_HORIZON_DAYS=0)
+    assert compute_trending_scores(timezone.now() + timedelta(seconds=1)) == {}
+
+
+def test_trending_listing_reads_score_table(user_client, aged_recipe):
+    call_command('compute_trending', stdout=io.StringIO())
+    order = expected_order()
+    assert order
+    assert not Recipe.objects.filter(
+        favorite_recipes__isnull=True, user_shopping_cart__isnull=True,
+        pk__in=order,
+    ).exists()
+    user_client.get(TRENDING_URL)
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(f'{TRENDING_URL}&limit=6')
+    assert response.status_code == 200
+    assert [item['id'] for item in response.json()['results']] == order[:6]
+    assert order.index(aged_recipe.id) > order.index(
+        fresh_recipe_like(aged_recipe).id
+    )
+    for query in context.captured_queries:
+        assert 'GROUP BY' not in query['sql']
+        assert 'COUNT("recipes_favorite' not in query['sql']
+
+
+def read_trending(client):
+    ids = []
+    url = f'{TRENDING_URL}&pagination=cursor&limit=5'
+    while url:
+        data = client.get(url).json()
+        ids.extend(item['id'] for item in data['results'])
+        url = data['next']
+    return ids
+
+
+def test_trending_listing_supports_cursor(anon_client, seed):
+    call_command('compute_trending', stdout=io.StringIO())
+    order = expected_order()
+    ids = read_trending(anon_client)
+    assert ids[:len(order)] == order
+    assert ids[len(order):] == list(
+        Recipe.objects.exclude(pk__in=order).order_by('-id').values_list(
+            'id', flat=True
+        )
+    )
+    assert anon_client.get(TRENDING_URL).json()['count'] == len(ids)
+
+
+def test_trending_cache_is_refreshed_by_recompute(anon_client, seed):
+    call_command('compute_trending', stdout=io.StringIO())
+    first = anon_client.get(TRENDING_URL).json()['results'][0]['id']
+    aged = []
+    for model in (Favorite, ShoppingCart):
+        rows = model.objects.filter(recipe_id=first)
+        aged.append((model, list(rows.values_list('pk', 'created_at'))))
+        rows.update(created_at=timezone.now() - timedelta(days=365))
+    call_command('compute_trending', stdout=io.StringIO())
+    ids = read_trending(anon_client)
+    assert first not in expected_order()
+    assert ids.index(first) >= len(expected_order())
+    for model, rows in aged:
+        for pk, created_at in rows:
+            model.objects.filter(pk=pk).update(created_at=created_at)
@@ -2,6 +2,10 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 
+PROFILE_FIELDS = frozenset(
+    ('username', 'first_name', 'last_name', 'email', 'avatar')
+)
+
 
 class User(AbstractUser):
     username = models.CharField(
@@ -49,6 +53,33 @@ class User(AbstractUser):
         null=True
     )
 
+    avatar_variants = models.ForeignKey(
+        'recipes.ImageVariants',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='users',
+        verbose_name="Варианты аватара"
+    )
+
+    recipes_count = models.PositiveIntegerField(
+        "Число рецептов",
+        default=0,
+        editable=False
+    )
+
+    followers_count = models.PositiveIntegerField(
+        "Число подписчиков",
+        default=0,
+        editable=False
+    )
+
+    updated_at = models.DateTimeField(
+        "Дата изменения",
+        auto_now=True
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -60,6 +91,14 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and PROFILE_FIELDS.intersection(
+            update_fields
+        ):
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     subscriber = models.ForeignKey(